@@ -1,3 +1,5 @@
+import os
+import time
 import flet as ft
 import requests
 from datetime import datetime
@@ -29,6 +31,10 @@ WEATHER_CODE_ICONS = {
     "425": "❄️☁️", "426": "❄️🌧️", "427": "❄️🌧️", "450": "❄️",
 }
 
+# WEATHER_STARTUP_TIMING=1 のときだけ、起動から地域一覧の初回描画（送信）までの時間を表示する
+STARTUP_TIMING = os.environ.get("WEATHER_STARTUP_TIMING") == "1"
+APP_STARTED_AT = time.perf_counter()
+
 COLORS = {
     "bg": "#E8F4F8",
     "sidebar_bg": "#FFFFFF",
@@ -54,14 +60,15 @@ def get_weather_icon(code):
     return WEATHER_CODE_ICONS.get(code, "🌈")
 
 
+RELIABILITY_INFO = {
+    "A": ("A", COLORS["badge_a"], "信頼度:高"),
+    "B": ("B", COLORS["badge_b"], "信頼度:中"),
+    "C": ("C", COLORS["badge_c"], "信頼度:低"),
+}
+
+
 def get_reliability_info(rel):
-    if rel == "A":
-        return ("A", COLORS["badge_a"], "信頼度:高")
-    elif rel == "B":
-        return ("B", COLORS["badge_b"], "信頼度:中")
-    elif rel == "C":
-        return ("C", COLORS["badge_c"], "信頼度:低")
-    return ("", "", "")
+    return RELIABILITY_INFO.get(rel, ("", "", ""))
 
 
 class WeatherApp:
@@ -246,40 +253,12 @@ class WeatherApp:
                     return icon
             return "📍"
         
+        # 地方の見出しだけ先に作り、府県のタイルは初めて開いたときに作る
         for center_code, center_info in centers.items():
             center_name = center_info["name"]
-            children_codes = center_info.get("children", [])
+            children_codes = [code for code in center_info.get("children", []) if code in offices]
             
-            child_tiles = []
-            for child_code in children_codes:
-                if child_code in offices:
-                    office = offices[child_code]
-                    office_name = office["name"]
-                    
-                    tile = ft.Container(
-                        content=ft.Row([
-                            ft.Container(
-                                content=ft.Icon(ft.Icons.LOCATION_CITY, size=18, color=COLORS["accent"]),
-                                width=38,
-                                height=38,
-                                bgcolor=COLORS["bg"],
-                                border_radius=10,
-                                alignment=ft.alignment.center,
-                            ),
-                            ft.Column([
-                                ft.Text(office_name, size=13, weight=ft.FontWeight.W_500, color=COLORS["text_dark"]),
-                                ft.Text(child_code, size=10, color=COLORS["text_light"]),
-                            ], spacing=2, expand=True),
-                        ], spacing=12),
-                        padding=ft.padding.symmetric(horizontal=12, vertical=10),
-                        border_radius=12,
-                        ink=True,
-                        on_click=lambda e, code=child_code, name=office_name: self.on_area_click(code, name),
-                        on_hover=lambda e: self.on_tile_hover(e),
-                    )
-                    child_tiles.append(tile)
-            
-            if child_tiles:
+            if children_codes:
                 expansion = ft.ExpansionTile(
                     leading=ft.Container(
                         content=ft.Text(get_region_icon(center_name), size=22),
@@ -290,15 +269,49 @@ class WeatherApp:
                         alignment=ft.alignment.center,
                     ),
                     title=ft.Text(center_name, size=14, weight=ft.FontWeight.BOLD, color=COLORS["text_dark"]),
-                    subtitle=ft.Text(f"{len(child_tiles)}地域", size=11, color=COLORS["text_light"]),
-                    controls=child_tiles,
+                    subtitle=ft.Text(f"{len(children_codes)}地域", size=11, color=COLORS["text_light"]),
+                    controls=[],
                     initially_expanded=False,
                     controls_padding=ft.padding.only(left=10, right=10, bottom=10),
                     tile_padding=ft.padding.symmetric(horizontal=12, vertical=8),
+                    on_change=lambda e, codes=children_codes: self.on_center_expand(e, codes),
                 )
                 self.area_list.controls.append(expansion)
         
         self.page.update()
+        if STARTUP_TIMING:
+            print(f"地域一覧の初回描画: {(time.perf_counter() - APP_STARTED_AT) * 1000:.0f} ms "
+                  f"(地方 {len(self.area_list.controls)} 件)")
+
+    def build_office_tile(self, office_code, office_name):
+        return ft.Container(
+            content=ft.Row([
+                ft.Container(
+                    content=ft.Icon(ft.Icons.LOCATION_CITY, size=18, color=COLORS["accent"]),
+                    width=38,
+                    height=38,
+                    bgcolor=COLORS["bg"],
+                    border_radius=10,
+                    alignment=ft.alignment.center,
+                ),
+                ft.Column([
+                    ft.Text(office_name, size=13, weight=ft.FontWeight.W_500, color=COLORS["text_dark"]),
+                    ft.Text(office_code, size=10, color=COLORS["text_light"]),
+                ], spacing=2, expand=True),
+            ], spacing=12),
+            padding=ft.padding.symmetric(horizontal=12, vertical=10),
+            border_radius=12,
+            ink=True,
+            on_click=lambda e: self.on_area_click(office_code, office_name),
+            on_hover=self.on_tile_hover,
+        )
+
+    def on_center_expand(self, e, codes):
+        if e.data != "true" or e.control.controls:
+            return
+        offices = self.area_data.get("offices", {})
+        e.control.controls = [self.build_office_tile(code, offices[code]["name"]) for code in codes]
+        e.control.update()
 
     def on_tile_hover(self, e):
         if e.data == "true":
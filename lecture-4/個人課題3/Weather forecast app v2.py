@@ -1,41 +1,39 @@
+import json
+import os
+import threading
+import time
 import flet as ft
-import requests
 from datetime import datetime
 from database import (
     init_database,
     save_areas_from_json,
-    save_forecasts_from_parsed_data,
     get_latest_forecasts,
     get_fetch_history,
     get_forecasts_by_date,
+    record_area_view,
+    set_area_pinned,
+    is_area_pinned,
+    get_area_tree,
+    areas_are_stale,
+    mark_areas_checked,
+    forecast_cache,
 )
+from retention import start_maintenance_thread
+from forecast_worker import LatestRequestRunner, fetch_and_store
+from jma_client import AREA_TTL, get_client
+from forecast_parser import parse_forecast_data
+from refresh_scheduler import RefreshScheduler
+from weather_codes import lookup_weather_code
+from area_search import AreaSearchIndex
+from analytics import format_stat, revision_stats
 
-AREA_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
-FORECAST_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/{}.json"
-
-WEATHER_CODE_ICONS = {
-    "100": "☀️", "101": "🌤️", "102": "🌤️🌧️", "103": "🌤️🌧️", "104": "🌤️❄️",
-    "110": "🌤️", "111": "🌤️", "112": "🌤️🌧️", "113": "🌤️🌧️", "114": "🌤️🌧️",
-    "115": "🌤️❄️", "116": "🌤️❄️", "117": "🌤️❄️", "118": "🌤️🌧️", "119": "🌤️⛈️",
-    "200": "☁️", "201": "☁️🌤️", "202": "☁️🌧️", "203": "☁️🌧️", "204": "☁️❄️",
-    "205": "☁️❄️", "206": "☁️🌧️", "207": "☁️🌧️", "208": "☁️🌧️", "209": "🌫️",
-    "210": "☁️🌤️", "211": "☁️🌤️", "212": "☁️🌧️", "213": "☁️🌧️", "214": "☁️🌧️",
-    "215": "☁️❄️", "216": "☁️❄️", "217": "☁️❄️", "218": "☁️🌧️", "219": "☁️⛈️",
-    "220": "☁️", "221": "☁️⛈️", "222": "☁️❄️⛈️", "223": "☁️🌤️", "224": "☁️⛈️",
-    "225": "☁️❄️", "226": "☁️❄️", "228": "☁️🌧️❄️", "229": "☁️🌧️❄️", "230": "☁️❄️",
-    "231": "☁️❄️⛈️", "240": "☁️", "250": "☁️", "260": "☁️❄️", "270": "☁️❄️",
-    "281": "☁️🌧️❄️",
-    "300": "🌧️", "301": "🌧️🌤️", "302": "🌧️☁️", "303": "🌧️❄️", "304": "🌧️",
-    "306": "🌧️", "308": "🌧️⛈️", "309": "🌧️❄️", "311": "🌧️🌤️", "313": "🌧️☁️",
-    "314": "🌧️❄️", "315": "🌧️❄️", "316": "🌧️☁️", "317": "🌧️☁️", "320": "🌧️",
-    "321": "🌧️☁️", "322": "🌧️⛈️", "323": "🌧️🌤️", "324": "🌧️🌤️", "325": "🌧️☁️",
-    "326": "🌧️❄️", "327": "🌧️❄️", "328": "🌧️❄️", "329": "🌧️❄️", "340": "🌧️❄️",
-    "350": "🌧️", "361": "❄️🌧️", "371": "❄️🌧️",
-    "400": "❄️", "401": "❄️🌤️", "402": "❄️☁️", "403": "❄️🌧️", "405": "❄️",
-    "406": "❄️", "407": "❄️⛈️", "409": "❄️🌧️", "411": "❄️🌤️", "413": "❄️☁️",
-    "414": "❄️🌧️", "420": "❄️", "421": "❄️☁️", "422": "❄️⛈️", "423": "❄️🌤️",
-    "425": "❄️☁️", "426": "❄️🌧️", "427": "❄️🌧️", "450": "❄️",
-}
+# WEATHER_STARTUP_TIMING=1 のときだけ、起動から地域一覧の初回描画（送信）までの時間を表示する。
+# 描画処理そのものの計測は benchmarks/bench_sidebar.py
+STARTUP_TIMING = os.environ.get("WEATHER_STARTUP_TIMING") == "1"
+APP_STARTED_AT = time.perf_counter()
+
+# 入力が止まってから検索するまでの待ち時間（秒）
+SEARCH_DEBOUNCE = 0.15
 
 COLORS = {
     "sidebar_bg": "#1E2330",
@@ -89,31 +87,264 @@ WEATHER_THEMES = {
 
 
 def get_weather_icon(code):
-    return WEATHER_CODE_ICONS.get(code, "🌈")
+    return lookup_weather_code(code).icon
 
 
 def get_weather_theme(code):
-    if not code:
-        return WEATHER_THEMES["sunny"]
-    code_num = int(code) if code.isdigit() else 100
-    if code_num < 200:
-        return WEATHER_THEMES["sunny"]
-    elif code_num < 300:
-        return WEATHER_THEMES["cloudy"]
-    elif code_num < 400:
-        return WEATHER_THEMES["rainy"]
-    else:
-        return WEATHER_THEMES["snowy"]
+    return WEATHER_THEMES[lookup_weather_code(code).theme]
+
+
+RELIABILITY_INFO = {
+    "A": ("A", COLORS["badge_a"], "信頼度：高い"),
+    "B": ("B", COLORS["badge_b"], "信頼度：普通"),
+    "C": ("C", COLORS["badge_c"], "信頼度：低い"),
+}
 
 
 def get_reliability_info(rel):
-    if rel == "A":
-        return ("A", COLORS["badge_a"], "信頼度：高い")
-    elif rel == "B":
-        return ("B", COLORS["badge_b"], "信頼度：普通")
-    elif rel == "C":
-        return ("C", COLORS["badge_c"], "信頼度：低い")
-    return ("", "", "")
+    return RELIABILITY_INFO.get(rel, ("", "", ""))
+
+
+def format_value(value, suffix=""):
+    if value is None or value == "":
+        return "--"
+    return f"{value}{suffix}"
+
+
+def patch(control, changed, **props):
+    # 値が変わったプロパティだけ書き換え、書き換えたコントロールを changed に積む
+    for name, value in props.items():
+        if getattr(control, name) != value:
+            setattr(control, name, value)
+            if control not in changed:
+                changed.append(control)
+
+
+class HeroCard:
+    def __init__(self):
+        self.theme_name = None
+        self.area_text = ft.Text("", size=28, weight=ft.FontWeight.BOLD)
+        self.date_text = ft.Text("", size=13)
+        self.icon_text = ft.Text("", size=80)
+        self.weather_text = ft.Text("", size=16, weight=ft.FontWeight.W_500)
+        self.temp_min_text = ft.Text("", size=24, color="#3B82F6", weight=ft.FontWeight.BOLD)
+        self.temp_max_text = ft.Text("", size=24, color="#EF4444", weight=ft.FontWeight.BOLD)
+        self.pop_text = ft.Text("", size=24, weight=ft.FontWeight.BOLD)
+        self.wind_text = ft.Text("", size=13, weight=ft.FontWeight.W_500)
+        self.sub_texts = [
+            ft.Text("気温", size=11),
+            ft.Text("/", size=18),
+            ft.Text("降水確率", size=11),
+            ft.Text("風", size=11),
+        ]
+        temp_label, slash, pop_label, wind_label = self.sub_texts
+        self.stat_boxes = [
+            ft.Container(
+                content=ft.Column([
+                    temp_label,
+                    ft.Row([self.temp_min_text, slash, self.temp_max_text], spacing=8),
+                ], spacing=4),
+                padding=ft.padding.symmetric(horizontal=20, vertical=12),
+                border_radius=12,
+            ),
+            ft.Container(
+                content=ft.Column([pop_label, self.pop_text], spacing=4),
+                padding=ft.padding.symmetric(horizontal=20, vertical=12),
+                border_radius=12,
+            ),
+            ft.Container(
+                content=ft.Column([wind_label, self.wind_text], spacing=4),
+                padding=ft.padding.symmetric(horizontal=20, vertical=12),
+                border_radius=12,
+                expand=True,
+            ),
+        ]
+        self.root = ft.Container(
+            content=ft.Column([
+                ft.Row([
+                    ft.Column([self.area_text, self.date_text], spacing=4),
+                    self.icon_text,
+                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                ft.Container(height=10),
+                self.weather_text,
+                ft.Container(height=20),
+                ft.Row(self.stat_boxes, spacing=12),
+            ]),
+            padding=30,
+            border_radius=20,
+            shadow=ft.BoxShadow(spread_radius=0, blur_radius=20, color="#00000015", offset=ft.Offset(0, 8)),
+        )
+
+    def set(self, area_name, today_data, changed):
+        code = today_data.get("weather_code", "100")
+        theme_name = lookup_weather_code(code).theme
+        theme = WEATHER_THEMES[theme_name]
+        wind = today_data.get("wind") or ""
+        
+        if theme_name != self.theme_name:
+            self.theme_name = theme_name
+            self.root.gradient = ft.LinearGradient(
+                begin=ft.alignment.top_left,
+                end=ft.alignment.bottom_right,
+                colors=theme["gradient"],
+            )
+            changed.append(self.root)
+        patch(self.area_text, changed, value=area_name, color=theme["text"])
+        patch(self.date_text, changed, value=f"{today_data.get('forecast_date', '')[:10]}  今日の天気", color=theme["sub_text"])
+        patch(self.icon_text, changed, value=get_weather_icon(code))
+        patch(self.weather_text, changed, value=today_data.get("weather") or "", color=theme["text"])
+        patch(self.temp_min_text, changed, value=format_value(today_data.get("temp_min"), "°"))
+        patch(self.temp_max_text, changed, value=format_value(today_data.get("temp_max"), "°"))
+        patch(self.pop_text, changed, value=format_value(today_data.get("pop"), "%"), color=theme["card_text"])
+        patch(self.wind_text, changed, value=wind[:10] + "..." if len(wind) > 10 else wind or "--", color=theme["card_text"])
+        for text in self.sub_texts:
+            patch(text, changed, color=theme["card_sub"])
+        for box in self.stat_boxes:
+            patch(box, changed, bgcolor=theme["card_bg"])
+
+
+class DayRow:
+    def __init__(self, label, last=False):
+        self.date_text = ft.Text("", size=11, color="#64748B", width=50)
+        self.icon_text = ft.Text("", size=28)
+        self.pop_text = ft.Text("", size=13, color="#64748B")
+        self.temp_min_text = ft.Text("", size=14, color=COLORS["temp_low"], weight=ft.FontWeight.BOLD)
+        self.temp_max_text = ft.Text("", size=14, color=COLORS["temp_high"], weight=ft.FontWeight.BOLD)
+        self.root = ft.Container(
+            content=ft.Row([
+                ft.Container(
+                    content=ft.Text(label, size=13, weight=ft.FontWeight.W_600, color="#1E293B"),
+                    width=60,
+                ),
+                self.date_text,
+                self.icon_text,
+                ft.Container(content=self.pop_text, width=50, alignment=ft.alignment.center),
+                ft.Row([
+                    self.temp_min_text,
+                    ft.Text("/", size=12, color="#CBD5E1"),
+                    self.temp_max_text,
+                ], spacing=4, width=80),
+            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            padding=ft.padding.symmetric(horizontal=16, vertical=14),
+            border=None if last else ft.border.only(bottom=ft.BorderSide(1, "#F1F5F9")),
+        )
+
+    def set(self, f, changed):
+        patch(self.root, changed, visible=f is not None)
+        if f is None:
+            return
+        patch(self.date_text, changed, value=f.get("forecast_date", "")[5:])
+        patch(self.icon_text, changed, value=get_weather_icon(f.get("weather_code", "100")))
+        patch(self.pop_text, changed, value=format_value(f.get("pop"), "%"))
+        patch(self.temp_min_text, changed, value=format_value(f.get("temp_min"), "°"))
+        patch(self.temp_max_text, changed, value=format_value(f.get("temp_max"), "°"))
+
+
+class WeeklyCell:
+    def __init__(self):
+        self.date_text = ft.Text("", size=12, weight=ft.FontWeight.W_600, color="#1E293B")
+        self.icon_text = ft.Text("", size=26)
+        self.pop_text = ft.Text("", size=11, color="#64748B")
+        self.temp_min_text = ft.Text("", size=12, color=COLORS["temp_low"], weight=ft.FontWeight.BOLD)
+        self.temp_max_text = ft.Text("", size=12, color=COLORS["temp_high"], weight=ft.FontWeight.BOLD)
+        self.badge_text = ft.Text("", size=9, color="#FFFFFF", weight=ft.FontWeight.BOLD)
+        self.badge = ft.Container(
+            content=self.badge_text,
+            height=16,
+            padding=ft.padding.symmetric(horizontal=8, vertical=2),
+            border_radius=4,
+        )
+        self.root = ft.Container(
+            content=ft.Column([
+                self.date_text,
+                self.icon_text,
+                self.pop_text,
+                ft.Row([
+                    self.temp_min_text,
+                    ft.Text("/", size=10, color="#CBD5E1"),
+                    self.temp_max_text,
+                ], spacing=2, alignment=ft.MainAxisAlignment.CENTER),
+                self.badge,
+            ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=6),
+            width=70,
+            padding=ft.padding.symmetric(vertical=12),
+        )
+
+    def set(self, f, changed):
+        patch(self.root, changed, visible=f is not None)
+        if f is None:
+            return
+        rel_badge, rel_color, rel_tip = get_reliability_info(f.get("reliability"))
+        patch(self.date_text, changed, value=f.get("forecast_date", "")[5:])
+        patch(self.icon_text, changed, value=get_weather_icon(f.get("weather_code", "100")))
+        patch(self.pop_text, changed, value=format_value(f.get("pop"), "%"))
+        patch(self.temp_min_text, changed, value=format_value(f.get("temp_min")))
+        patch(self.temp_max_text, changed, value=format_value(f.get("temp_max")))
+        patch(self.badge_text, changed, value=rel_badge)
+        patch(self.badge, changed, bgcolor=rel_color or None, tooltip=rel_tip or None)
+
+
+class WeatherView:
+    # 予報表示のコントロールは一度だけ作り、地域や履歴の切り替えでは値だけ差し替える
+    WEEKLY_DAYS = 7
+
+    def __init__(self):
+        self.hero = HeroCard()
+        self.day_rows = [DayRow(label, last=i == 2) for i, label in enumerate(["今日", "明日", "明後日"])]
+        self.weekly_cells = [WeeklyCell() for _ in range(self.WEEKLY_DAYS)]
+        self.weekly_card = ft.Container(
+            content=ft.Column([
+                ft.Container(
+                    content=ft.Text("週間予報", size=14, weight=ft.FontWeight.BOLD, color="#1E293B"),
+                    padding=ft.padding.only(left=16, top=16, bottom=12),
+                ),
+                ft.Container(
+                    content=ft.Row([cell.root for cell in self.weekly_cells], alignment=ft.MainAxisAlignment.SPACE_AROUND),
+                    padding=ft.padding.only(bottom=16),
+                ),
+            ]),
+            bgcolor="#FFFFFF",
+            border_radius=16,
+            shadow=ft.BoxShadow(spread_radius=0, blur_radius=10, color="#00000008", offset=ft.Offset(0, 4)),
+        )
+        three_day_card = ft.Container(
+            content=ft.Column([
+                ft.Container(
+                    content=ft.Text("3日間の予報", size=14, weight=ft.FontWeight.BOLD, color="#1E293B"),
+                    padding=ft.padding.only(left=16, top=16, bottom=8),
+                ),
+                ft.Column([row.root for row in self.day_rows], spacing=0),
+            ]),
+            bgcolor="#FFFFFF",
+            border_radius=16,
+            shadow=ft.BoxShadow(spread_radius=0, blur_radius=10, color="#00000008", offset=ft.Offset(0, 4)),
+        )
+        self.root = ft.Container(
+            content=ft.Column([
+                self.hero.root,
+                ft.Container(height=20),
+                three_day_card,
+                ft.Container(height=16),
+                self.weekly_card,
+            ], scroll=ft.ScrollMode.AUTO),
+            padding=24,
+            expand=True,
+        )
+
+    def set(self, area_name, forecasts):
+        changed = []
+        self.hero.set(area_name, forecasts[0], changed)
+        for i, row in enumerate(self.day_rows):
+            row.set(forecasts[i] if i < len(forecasts) else None, changed)
+        
+        weekly = [
+            f for f in forecasts[3:]
+            if f.get("pop") is not None or f.get("temp_min") is not None or f.get("temp_max") is not None
+        ][:self.WEEKLY_DAYS]
+        for i, cell in enumerate(self.weekly_cells):
+            cell.set(weekly[i] if i < len(weekly) else None, changed)
+        patch(self.weekly_card, changed, visible=bool(weekly))
+        return changed
 
 
 class WeatherApp:
@@ -128,8 +359,17 @@ class WeatherApp:
         self.area_data = {}
         self.current_area_code = None
         self.current_area_name = None
+        # 画面に出している発表の reportDatetime（別プロセスが保存した新しい発表との比較に使う）
+        self.shown_report_datetime = None
+        self.fetch_runner = LatestRequestRunner()
+        # 選択中の地域の切り替えと、その地域の描画を1つの操作にまとめる（古い取得結果の上書きを防ぐ）
+        self.render_lock = threading.RLock()
+        self.stale_while_revalidate = True
         
         init_database()
+        start_background_jobs()
+        OPEN_APPS.add(self)
+        self.page.on_close = lambda e: OPEN_APPS.discard(self)
         
         self.history_dropdown = ft.Dropdown(
             label="過去の予報",
@@ -140,11 +380,44 @@ class WeatherApp:
             text_size=12,
         )
         
+        self.pin_button = ft.IconButton(
+            icon=ft.Icons.PUSH_PIN_OUTLINED,
+            selected_icon=ft.Icons.PUSH_PIN,
+            selected=False,
+            visible=False,
+            icon_color=COLORS["accent"],
+            tooltip="定時更新の対象にする",
+            on_click=self.on_pin_click,
+        )
+        
+        self.stats_button = ft.IconButton(
+            icon=ft.Icons.INSIGHTS,
+            visible=False,
+            icon_color=COLORS["accent"],
+            tooltip="予報の精度",
+            on_click=self.on_stats_click,
+        )
+        
+        self.weather_view = WeatherView()
         self.weather_container = ft.Container(
             content=self.build_welcome_screen(),
             expand=True,
         )
         
+        self.search_index = None
+        self.search_timer = None
+        self.area_tree = []
+        self.search_field = ft.TextField(
+            hint_text="地域を検索（漢字・かな・ローマ字）",
+            prefix_icon=ft.Icons.SEARCH,
+            dense=True,
+            text_size=12,
+            color=COLORS["text_white"],
+            border_color="#374151",
+            focused_border_color=COLORS["accent"],
+            on_change=self.on_search_change,
+        )
+        
         self.area_list = ft.ListView(
             expand=True,
             spacing=2,
@@ -217,6 +490,7 @@ class WeatherApp:
                     content=ft.Text("地域選択", size=11, color=COLORS["text_gray"], weight=ft.FontWeight.W_500),
                     padding=ft.padding.only(left=16, top=12, bottom=8),
                 ),
+                ft.Container(content=self.search_field, padding=ft.padding.symmetric(horizontal=12)),
                 ft.Container(content=self.area_list, expand=True),
             ], spacing=0),
             width=260,
@@ -226,6 +500,8 @@ class WeatherApp:
         header = ft.Container(
             content=ft.Row([
                 ft.Row([
+                    self.stats_button,
+                    self.pin_button,
                     self.history_dropdown,
                 ]),
             ], alignment=ft.MainAxisAlignment.END),
@@ -244,84 +520,180 @@ class WeatherApp:
         )
 
     def load_area_data(self):
+        # 保存済みの地域一覧があればネットワークを待たずにサイドバーを出し、古いときだけ裏で取り直す
         try:
-            response = requests.get(AREA_URL, timeout=10)
-            self.area_data = response.json()
-            save_areas_from_json(self.area_data)
-            self.build_area_list()
+            self.area_data = get_area_tree()
+            if self.area_data["centers"]:
+                self.search_index = AreaSearchIndex.from_database()
+                self.build_area_list()
+                if areas_are_stale(AREA_TTL):
+                    threading.Thread(target=self.refresh_area_data, daemon=True).start()
+            else:
+                self.refresh_area_data()
         except Exception as e:
             self.area_list.controls = [
                 ft.Text(f"エラー: {e}", color=COLORS["badge_c"], size=12)
             ]
             self.page.update()
 
+    def refresh_area_data(self):
+        try:
+            area_data = json.loads(get_client().fetch_area_data()["content"])
+            changed = save_areas_from_json(area_data)
+            mark_areas_checked()
+        except Exception as e:
+            if not self.area_tree:
+                raise
+            print(f"地域一覧の更新に失敗しました（保存済みの一覧を表示中）: {e}")
+            return
+        
+        if changed or not self.area_tree:
+            self.area_data = area_data
+            self.search_index = AreaSearchIndex.from_database()
+            self.build_area_list()
+            if self.search_field.value:
+                self.apply_search(self.search_field.value)
+
     def build_area_list(self):
         centers = self.area_data.get("centers", {})
         offices = self.area_data.get("offices", {})
         self.area_list.controls = []
         
+        # 地方の見出しだけ先に作り、府県のタイルは初めて開いたときに作る
         for center_code, center_info in centers.items():
             center_name = center_info["name"]
-            children_codes = center_info.get("children", [])
+            children_codes = [code for code in center_info.get("children", []) if code in offices]
             
-            child_tiles = []
-            for child_code in children_codes:
-                if child_code in offices:
-                    office_name = offices[child_code]["name"]
-                    tile = ft.Container(
-                        content=ft.Text(office_name, size=12, color=COLORS["text_white"]),
-                        padding=ft.padding.symmetric(horizontal=16, vertical=10),
-                        border_radius=6,
-                        on_click=lambda e, code=child_code, name=office_name: self.on_area_click(code, name),
-                        on_hover=lambda e: self.on_tile_hover(e),
-                    )
-                    child_tiles.append(tile)
-            
-            if child_tiles:
+            if children_codes:
                 expansion = ft.ExpansionTile(
                     title=ft.Text(center_name, size=12, weight=ft.FontWeight.W_600, color=COLORS["text_white"]),
-                    subtitle=ft.Text(f"{len(child_tiles)}地域", size=10, color=COLORS["text_gray"]),
-                    controls=child_tiles,
+                    subtitle=ft.Text(f"{len(children_codes)}地域", size=10, color=COLORS["text_gray"]),
+                    controls=[],
                     initially_expanded=False,
                     tile_padding=ft.padding.symmetric(horizontal=12, vertical=4),
                     collapsed_icon_color=COLORS["text_gray"],
                     icon_color=COLORS["text_white"],
                     bgcolor=COLORS["sidebar_hover"],
                     collapsed_bgcolor=COLORS["sidebar_bg"],
+                    on_change=lambda e, codes=children_codes: self.on_center_expand(e, codes),
                 )
                 self.area_list.controls.append(expansion)
         
+        first_paint = not self.area_tree
+        self.area_tree = list(self.area_list.controls)
         self.page.update()
+        if first_paint and STARTUP_TIMING:
+            print(f"地域一覧の初回描画: {(time.perf_counter() - APP_STARTED_AT) * 1000:.0f} ms "
+                  f"(地方 {len(self.area_list.controls)} 件)")
+
+    def build_office_tile(self, office_code, office_name, label=None):
+        return ft.Container(
+            content=ft.Text(label or office_name, size=12, color=COLORS["text_white"]),
+            padding=ft.padding.symmetric(horizontal=16, vertical=10),
+            border_radius=6,
+            on_click=lambda e: self.on_area_click(office_code, office_name),
+            on_hover=self.on_tile_hover,
+        )
+
+    def on_center_expand(self, e, codes):
+        if e.data != "true" or e.control.controls:
+            return
+        offices = self.area_data.get("offices", {})
+        e.control.controls = [self.build_office_tile(code, offices[code]["name"]) for code in codes]
+        e.control.update()
+
+    def on_search_change(self, e):
+        # キー入力ごとには絞り込まず、入力が止まってから一度だけ検索する
+        if self.search_timer:
+            self.search_timer.cancel()
+        self.search_timer = threading.Timer(SEARCH_DEBOUNCE, self.apply_search, args=(e.control.value,))
+        self.search_timer.daemon = True
+        self.search_timer.start()
+
+    def apply_search(self, query):
+        if self.search_index is None or query != self.search_field.value:
+            return
+        if not query.strip():
+            self.area_list.controls = self.area_tree
+        else:
+            tiles = []
+            for office, sub_area in self.search_index.office_targets(query):
+                label = f"{office['area_name']} › {sub_area['area_name']}" if sub_area else None
+                tiles.append(self.build_office_tile(office["area_code"], office["area_name"], label))
+            self.area_list.controls = tiles or [
+                ft.Container(
+                    content=ft.Text("該当する地域がありません", size=12, color=COLORS["text_gray"]),
+                    padding=ft.padding.symmetric(horizontal=16, vertical=10),
+                )
+            ]
+        self.area_list.update()
 
     def on_tile_hover(self, e):
         e.control.bgcolor = COLORS["sidebar_hover"] if e.data == "true" else None
         e.control.update()
 
     def on_area_click(self, area_code, area_name):
-        self.current_area_code = area_code
-        self.current_area_name = area_name
+        with self.render_lock:
+            self.current_area_code = area_code
+            self.current_area_name = area_name
+            self.pin_button.selected = is_area_pinned(area_code)
+            self.pin_button.visible = True
+            self.pin_button.update()
+            if not self.stats_button.visible:
+                self.stats_button.visible = True
+                self.stats_button.update()
         
-        try:
-            self.weather_container.content = ft.Container(
-                content=ft.Column([
-                    ft.ProgressRing(width=40, height=40, color=COLORS["accent"]),
-                    ft.Container(height=16),
-                    ft.Text("データを取得中...", size=14, color="#64748B"),
-                ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, alignment=ft.MainAxisAlignment.CENTER),
-                expand=True,
-            )
-            self.page.update()
-            
-            url = FORECAST_URL.format(area_code)
-            response = requests.get(url, timeout=10)
-            forecast_data = response.json()
-            
-            parsed_data = self.parse_forecast_data(forecast_data)
-            save_forecasts_from_parsed_data(area_code, area_name, parsed_data)
-            self.update_history_dropdown(area_code)
-            self.display_weather_from_db(area_code, area_name)
-            
-        except Exception as e:
+            # 保存済みのスナップショットがあれば即座に表示し、裏で最新の発表を取りに行く
+            cached = get_latest_forecasts(area_code) if self.stale_while_revalidate else []
+            if cached:
+                self.update_history_dropdown(area_code)
+                self.display_weather_from_db(area_code, area_name, forecasts=cached)
+            else:
+                self.weather_container.content = ft.Container(
+                    content=ft.Column([
+                        ft.ProgressRing(width=40, height=40, color=COLORS["accent"]),
+                        ft.Container(height=16),
+                        ft.Text("データを取得中...", size=14, color="#64748B"),
+                    ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, alignment=ft.MainAxisAlignment.CENTER),
+                    expand=True,
+                )
+                self.page.update()
+        
+        # 閲覧履歴の記録・取得・解析・保存はバックグラウンドで行い、最後に選ばれた地域の結果だけを描画する
+        def job(is_stale):
+            record_area_view(area_code, area_name)
+            return fetch_and_store(area_code, area_name, parse_forecast_data, is_stale)
+
+        self.fetch_runner.submit(
+            job,
+            on_done=lambda result: self.on_forecast_saved(area_code, area_name, result, bool(cached)),
+            on_error=lambda e: self.on_forecast_error(e, bool(cached), area_code),
+        )
+
+    def on_forecast_saved(self, area_code, area_name, result, shown_cached=False):
+        # 表示済みの内容と同じ発表なら再描画しない。書き込みが重複で省かれても、
+        # 別プロセス（refresh_scheduler や一括取り込み）が先に保存した新しい発表なら描き直す
+        if shown_cached and (not result or not result["written"]):
+            if not result or result.get("report_datetime") in (None, self.shown_report_datetime):
+                return
+            forecast_cache.invalidate(area_code)
+        with self.render_lock:
+            # 取得中に別の地域が選ばれていたら、その地域の表示を上書きしない
+            if area_code != self.current_area_code:
+                return
+            try:
+                self.update_history_dropdown(area_code)
+                self.display_weather_from_db(area_code, area_name)
+            except Exception as e:
+                self.on_forecast_error(e)
+
+    def on_forecast_error(self, e, shown_cached=False, area_code=None):
+        if shown_cached:
+            print(f"予報の更新に失敗しました（保存済みデータを表示中）: {e}")
+            return
+        with self.render_lock:
+            if area_code is not None and area_code != self.current_area_code:
+                return
             self.weather_container.content = ft.Container(
                 content=ft.Column([
                     ft.Text("😢", size=50),
@@ -332,6 +704,62 @@ class WeatherApp:
             )
             self.page.update()
 
+    def on_pin_click(self, e):
+        if not self.current_area_code:
+            return
+        self.pin_button.selected = not self.pin_button.selected
+        set_area_pinned(self.current_area_code, self.current_area_name, self.pin_button.selected)
+        self.pin_button.update()
+
+    def on_stats_click(self, e):
+        if self.current_area_code:
+            self.display_revision_stats(self.current_area_code, self.current_area_name)
+
+    def display_revision_stats(self, area_code, area_name):
+        # 保存済みの履歴から、何日前の予報がどれだけ確定値とずれていたかを表にする
+        stats = revision_stats(area_code)
+        if not stats:
+            content = ft.Text("集計できる予報履歴がまだありません", color="#64748B")
+        else:
+            columns = ["何日前", "件数", "最高気温の誤差", "最低気温の誤差", "降水確率の誤差", "改訂率", "的中率 A", "的中率 B", "的中率 C"]
+            content = ft.DataTable(
+                columns=[ft.DataColumn(ft.Text(name, size=12, weight=ft.FontWeight.W_600)) for name in columns],
+                rows=[
+                    ft.DataRow(cells=[ft.DataCell(ft.Text(value, size=12)) for value in [
+                        f"{row['lead_days']}日前",
+                        str(row['samples']),
+                        format_stat(row['temp_max_mae']),
+                        format_stat(row['temp_min_mae']),
+                        format_stat(row['pop_mae']),
+                        format_stat(row['revision_rate'], percent=True),
+                        format_stat(row['hit_rate_a'], percent=True),
+                        format_stat(row['hit_rate_b'], percent=True),
+                        format_stat(row['hit_rate_c'], percent=True),
+                    ]])
+                    for row in stats
+                ],
+            )
+        
+        self.weather_container.content = ft.Container(
+            content=ft.Column([
+                ft.Text(f"{area_name}  予報の精度", size=20, weight=ft.FontWeight.BOLD, color="#1E293B"),
+                ft.Text("誤差は最も新しい予報との差の平均。的中率は天気の種類（晴・曇・雨・雪）が最終的な予報と一致した割合",
+                        size=11, color="#64748B"),
+                ft.Container(height=12),
+                ft.Container(content=content, bgcolor="#FFFFFF", border_radius=16, padding=16),
+            ], scroll=ft.ScrollMode.AUTO),
+            padding=24,
+            expand=True,
+        )
+        self.weather_container.update()
+
+    def on_scheduled_refresh(self, report):
+        # 定時更新で表示中の地域に新しい発表が入ったときだけ、保存済みデータから描き直す
+        area_code, area_name = self.current_area_code, self.current_area_name
+        result = report.get("results", {}).get(area_code)
+        if result:
+            self.on_forecast_saved(area_code, area_name, result, shown_cached=True)
+
     def update_history_dropdown(self, area_code):
         history = get_fetch_history(area_code)
         if len(history) > 1:
@@ -340,306 +768,58 @@ class WeatherApp:
             self.history_dropdown.visible = True
         else:
             self.history_dropdown.visible = False
-        self.page.update()
+        self.history_dropdown.update()
 
     def on_history_select(self, e):
         if self.current_area_code and e.control.value:
             self.display_weather_from_db(self.current_area_code, self.current_area_name, fetched_at=e.control.value)
 
-    def parse_forecast_data(self, forecast_data):
-        result = {}
-        
-        if len(forecast_data) >= 1:
-            three_day = forecast_data[0]
-            time_series = three_day.get("timeSeries", [])
-            
-            if len(time_series) >= 1:
-                weather_ts = time_series[0]
-                time_defines = weather_ts.get("timeDefines", [])
-                areas = weather_ts.get("areas", [])
-                
-                if areas:
-                    area = areas[0]
-                    weather_codes = area.get("weatherCodes", [])
-                    weathers = area.get("weathers", [])
-                    winds = area.get("winds", [])
-                    waves = area.get("waves", [])
-                    
-                    for i, time_def in enumerate(time_defines):
-                        date_str = time_def[:10]
-                        if date_str not in result:
-                            result[date_str] = {}
-                        result[date_str]["weather_code"] = weather_codes[i] if i < len(weather_codes) else ""
-                        result[date_str]["weather"] = weathers[i] if i < len(weathers) else ""
-                        result[date_str]["wind"] = winds[i] if i < len(winds) else ""
-                        result[date_str]["wave"] = waves[i] if i < len(waves) else ""
-            
-            if len(time_series) >= 2:
-                pop_ts = time_series[1]
-                pop_times = pop_ts.get("timeDefines", [])
-                pop_areas = pop_ts.get("areas", [])
-                
-                if pop_areas:
-                    pops = pop_areas[0].get("pops", [])
-                    for i, time_def in enumerate(pop_times):
-                        date_str = time_def[:10]
-                        if date_str not in result:
-                            result[date_str] = {}
-                        if "pop" not in result[date_str] and i < len(pops) and pops[i]:
-                            result[date_str]["pop"] = pops[i]
-            
-            if len(time_series) >= 3:
-                temp_ts = time_series[2]
-                temp_times = temp_ts.get("timeDefines", [])
-                temp_areas = temp_ts.get("areas", [])
-                
-                if temp_areas and len(temp_times) >= 2:
-                    temps = temp_areas[0].get("temps", [])
-                    tomorrow_date = temp_times[0][:10]
-                    if tomorrow_date not in result:
-                        result[tomorrow_date] = {}
-                    if len(temps) >= 1 and temps[0]:
-                        result[tomorrow_date]["temp_min"] = temps[0]
-                    if len(temps) >= 2 and temps[1]:
-                        result[tomorrow_date]["temp_max"] = temps[1]
-        
-        if len(forecast_data) >= 2:
-            weekly = forecast_data[1]
-            weekly_ts = weekly.get("timeSeries", [])
-            
-            if len(weekly_ts) >= 1:
-                weather_ts = weekly_ts[0]
-                time_defines = weather_ts.get("timeDefines", [])
-                areas = weather_ts.get("areas", [])
-                
-                if areas:
-                    area = areas[0]
-                    weather_codes = area.get("weatherCodes", [])
-                    pops = area.get("pops", [])
-                    reliabilities = area.get("reliabilities", [])
-                    
-                    for i, time_def in enumerate(time_defines):
-                        date_str = time_def[:10]
-                        if date_str not in result:
-                            result[date_str] = {}
-                        if "weather_code" not in result[date_str] and i < len(weather_codes):
-                            result[date_str]["weather_code"] = weather_codes[i]
-                        if "pop" not in result[date_str] and i < len(pops) and pops[i]:
-                            result[date_str]["pop"] = pops[i]
-                        if i < len(reliabilities) and reliabilities[i]:
-                            result[date_str]["reliability"] = reliabilities[i]
-            
-            if len(weekly_ts) >= 2:
-                temp_ts = weekly_ts[1]
-                temp_times = temp_ts.get("timeDefines", [])
-                temp_areas = temp_ts.get("areas", [])
-                
-                if temp_areas:
-                    area = temp_areas[0]
-                    temps_min = area.get("tempsMin", [])
-                    temps_max = area.get("tempsMax", [])
-                    
-                    for i, time_def in enumerate(temp_times):
-                        date_str = time_def[:10]
-                        if date_str not in result:
-                            result[date_str] = {}
-                        if "temp_min" not in result[date_str] and i < len(temps_min) and temps_min[i]:
-                            result[date_str]["temp_min"] = temps_min[i]
-                        if "temp_max" not in result[date_str] and i < len(temps_max) and temps_max[i]:
-                            result[date_str]["temp_max"] = temps_max[i]
-        
-        return result
-
-    def display_weather_from_db(self, area_code, area_name, fetched_at=None):
-        forecasts = get_forecasts_by_date(area_code, fetched_at) if fetched_at else get_latest_forecasts(area_code)
+    def display_weather_from_db(self, area_code, area_name, fetched_at=None, forecasts=None):
+        if forecasts is None:
+            # 同じ地域を行き来するときは database.forecast_cache から返る
+            forecasts = get_forecasts_by_date(area_code, fetched_at) if fetched_at else get_latest_forecasts(area_code)
         
         if not forecasts:
             self.weather_container.content = ft.Text("データがありません", color="#64748B")
             self.page.update()
             return
         
-        today_data = forecasts[0] if forecasts else {}
-        today_code = today_data.get("weather_code", "100")
-        theme = get_weather_theme(today_code)
-        
-        today_weather = today_data.get("weather", "")
-        today_pop = today_data.get("pop", "--")
-        today_temp_min = today_data.get("temp_min", "--")
-        today_temp_max = today_data.get("temp_max", "--")
-        today_wind = today_data.get("wind", "")
-        today_date = today_data.get("forecast_date", "")[:10]
-        
-        hero_section = ft.Container(
-            content=ft.Column([
-                ft.Row([
-                    ft.Column([
-                        ft.Text(area_name, size=28, weight=ft.FontWeight.BOLD, color=theme["text"]),
-                        ft.Text(f"{today_date}  今日の天気", size=13, color=theme["sub_text"]),
-                    ], spacing=4),
-                    ft.Text(get_weather_icon(today_code), size=80),
-                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                ft.Container(height=10),
-                ft.Text(today_weather, size=16, color=theme["text"], weight=ft.FontWeight.W_500),
-                ft.Container(height=20),
-                ft.Row([
-                    ft.Container(
-                        content=ft.Column([
-                            ft.Text("気温", size=11, color=theme["card_sub"]),
-                            ft.Row([
-                                ft.Text(f"{today_temp_min}°" if today_temp_min and today_temp_min != "--" else "--", size=24, color="#3B82F6", weight=ft.FontWeight.BOLD),
-                                ft.Text("/", size=18, color=theme["card_sub"]),
-                                ft.Text(f"{today_temp_max}°" if today_temp_max and today_temp_max != "--" else "--", size=24, color="#EF4444", weight=ft.FontWeight.BOLD),
-                            ], spacing=8),
-                        ], spacing=4),
-                        bgcolor=theme["card_bg"],
-                        padding=ft.padding.symmetric(horizontal=20, vertical=12),
-                        border_radius=12,
-                    ),
-                    ft.Container(
-                        content=ft.Column([
-                            ft.Text("降水確率", size=11, color=theme["card_sub"]),
-                            ft.Text(f"{today_pop}%" if today_pop and today_pop != "--" else "--", size=24, color=theme["card_text"], weight=ft.FontWeight.BOLD),
-                        ], spacing=4),
-                        bgcolor=theme["card_bg"],
-                        padding=ft.padding.symmetric(horizontal=20, vertical=12),
-                        border_radius=12,
-                    ),
-                    ft.Container(
-                        content=ft.Column([
-                            ft.Text("風", size=11, color=theme["card_sub"]),
-                            ft.Text(today_wind[:10] + "..." if len(today_wind) > 10 else today_wind or "--", size=13, color=theme["card_text"], weight=ft.FontWeight.W_500),
-                        ], spacing=4),
-                        bgcolor=theme["card_bg"],
-                        padding=ft.padding.symmetric(horizontal=20, vertical=12),
-                        border_radius=12,
-                        expand=True,
-                    ),
-                ], spacing=12),
-            ]),
-            padding=30,
-            border_radius=20,
-            gradient=ft.LinearGradient(
-                begin=ft.alignment.top_left,
-                end=ft.alignment.bottom_right,
-                colors=theme["gradient"],
-            ),
-            shadow=ft.BoxShadow(spread_radius=0, blur_radius=20, color="#00000015", offset=ft.Offset(0, 8)),
-        )
-        
-        day_labels = ["今日", "明日", "明後日"]
-        forecast_items = []
-        for i, f in enumerate(forecasts[:3]):
-            date_str = f.get("forecast_date", "")[5:]
-            code = f.get("weather_code", "100")
-            pop = f.get("pop", "--")
-            t_min = f.get("temp_min", "--")
-            t_max = f.get("temp_max", "--")
-            
-            item = ft.Container(
-                content=ft.Row([
-                    ft.Container(
-                        content=ft.Text(day_labels[i] if i < 3 else date_str, size=13, weight=ft.FontWeight.W_600, color="#1E293B"),
-                        width=60,
-                    ),
-                    ft.Text(date_str, size=11, color="#64748B", width=50),
-                    ft.Text(get_weather_icon(code), size=28),
-                    ft.Container(
-                        content=ft.Text(f"{pop}%", size=13, color="#64748B"),
-                        width=50,
-                        alignment=ft.alignment.center,
-                    ),
-                    ft.Row([
-                        ft.Text(f"{t_min}°" if t_min != "--" else "--", size=14, color=COLORS["temp_low"], weight=ft.FontWeight.BOLD),
-                        ft.Text("/", size=12, color="#CBD5E1"),
-                        ft.Text(f"{t_max}°" if t_max != "--" else "--", size=14, color=COLORS["temp_high"], weight=ft.FontWeight.BOLD),
-                    ], spacing=4, width=80),
-                ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                padding=ft.padding.symmetric(horizontal=16, vertical=14),
-                border=ft.border.only(bottom=ft.BorderSide(1, "#F1F5F9")) if i < 2 else None,
-            )
-            forecast_items.append(item)
-        
-        three_day_card = ft.Container(
-            content=ft.Column([
-                ft.Container(
-                    content=ft.Text("3日間の予報", size=14, weight=ft.FontWeight.BOLD, color="#1E293B"),
-                    padding=ft.padding.only(left=16, top=16, bottom=8),
-                ),
-                ft.Column(forecast_items, spacing=0),
-            ]),
-            bgcolor="#FFFFFF",
-            border_radius=16,
-            shadow=ft.BoxShadow(spread_radius=0, blur_radius=10, color="#00000008", offset=ft.Offset(0, 4)),
-        )
-        
-        weekly_items = []
-        for f in forecasts[3:]:
-            date_str = f.get("forecast_date", "")[5:]
-            code = f.get("weather_code", "100")
-            pop = f.get("pop", "")
-            rel = f.get("reliability", "")
-            t_min = f.get("temp_min", "")
-            t_max = f.get("temp_max", "")
-            
-            if not pop and not t_min and not t_max:
-                continue
-            
-            rel_badge, rel_color, rel_tip = get_reliability_info(rel)
-            
-            item = ft.Container(
-                content=ft.Column([
-                    ft.Text(date_str, size=12, weight=ft.FontWeight.W_600, color="#1E293B"),
-                    ft.Text(get_weather_icon(code), size=26),
-                    ft.Text(f"{pop}%" if pop else "--", size=11, color="#64748B"),
-                    ft.Row([
-                        ft.Text(t_min if t_min else "--", size=12, color=COLORS["temp_low"], weight=ft.FontWeight.BOLD),
-                        ft.Text("/", size=10, color="#CBD5E1"),
-                        ft.Text(t_max if t_max else "--", size=12, color=COLORS["temp_high"], weight=ft.FontWeight.BOLD),
-                    ], spacing=2, alignment=ft.MainAxisAlignment.CENTER),
-                    ft.Container(
-                        content=ft.Text(rel_badge, size=9, color="#FFFFFF", weight=ft.FontWeight.BOLD),
-                        bgcolor=rel_color,
-                        padding=ft.padding.symmetric(horizontal=8, vertical=2),
-                        border_radius=4,
-                    ) if rel_badge else ft.Container(height=16),
-                ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=6),
-                width=70,
-                padding=ft.padding.symmetric(vertical=12),
-            )
-            weekly_items.append(item)
-        
-        weekly_card = ft.Container(
-            content=ft.Column([
-                ft.Container(
-                    content=ft.Text("週間予報", size=14, weight=ft.FontWeight.BOLD, color="#1E293B"),
-                    padding=ft.padding.only(left=16, top=16, bottom=12),
-                ),
-                ft.Container(
-                    content=ft.Row(weekly_items, alignment=ft.MainAxisAlignment.SPACE_AROUND),
-                    padding=ft.padding.only(bottom=16),
-                ),
-            ]),
-            bgcolor="#FFFFFF",
-            border_radius=16,
-            shadow=ft.BoxShadow(spread_radius=0, blur_radius=10, color="#00000008", offset=ft.Offset(0, 4)),
-        ) if weekly_items else ft.Container()
-        
-        self.weather_container.content = ft.Container(
-            content=ft.Column([
-                hero_section,
-                ft.Container(height=20),
-                three_day_card,
-                ft.Container(height=16),
-                weekly_card,
-            ], scroll=ft.ScrollMode.AUTO),
-            padding=24,
-            expand=True,
-        )
-        self.page.update()
+        self.shown_report_datetime = forecasts[0].get("report_datetime")
+        changed = self.weather_view.set(area_name, forecasts)
+        if self.weather_container.content is not self.weather_view.root:
+            # 読み込み中やエラー表示からの切り替え時だけ表示全体を送る
+            self.weather_container.content = self.weather_view.root
+            self.weather_container.update()
+        elif changed:
+            self.page.update(*changed)
+
+
+# 開いているページごとの WeatherApp。定時更新の結果はここに配る
+OPEN_APPS = set()
+_background_lock = threading.Lock()
+_background_jobs = {}
+
+
+def notify_scheduled_refresh(report):
+    for app in list(OPEN_APPS):
+        try:
+            app.on_scheduled_refresh(report)
+        except Exception as e:
+            # 閉じかけのページで失敗しても、ほかのページへの通知は続ける
+            print(f"定時更新の反映に失敗しました: {e}")
+
+
+def start_background_jobs():
+    # 定時更新と DB の保守はプロセスで1つだけ動かす（ページを開くたびに増やさない）
+    with _background_lock:
+        if not _background_jobs:
+            _background_jobs["maintenance_stop"] = start_maintenance_thread()
+            _background_jobs["refresh_scheduler"] = RefreshScheduler(on_refresh=notify_scheduled_refresh).start()
 
 
 def main(page: ft.Page):
     WeatherApp(page)
 
 
-ft.app(main)
+if __name__ == "__main__":
+    ft.app(main)
@@ -0,0 +1,157 @@
+import argparse
+import time
+
+from database import connection, init_database
+
+RELIABILITY_GRADES = ("A", "B", "C")
+
+
+DAY_SECONDS = 24 * 60 * 60
+
+# julianday() の 1970-01-01 に当たる値
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+# 確定値を1回の並べ替えで引くため (リードタイム, 値) を1つの整数に詰める
+PACK_BASE = 1000000
+PACK_OFFSET = 500000
+
+
+def _integer(column):
+    # 気温・降水確率・天気コードは整数で保存されている。数値化できなかった値は集計から外す
+    return f"CASE WHEN typeof({column}) = 'integer' THEN {column} END"
+
+
+def _final(column):
+    # その予報日で一番新しい（リードタイムが最も短い）非 NULL の値を「確定値」とみなす
+    return (f"MIN(CASE WHEN {column} IS NOT NULL THEN lead_days * {PACK_BASE} + {column} + {PACK_OFFSET} END) "
+            f"OVER whole % {PACK_BASE} - {PACK_OFFSET}")
+
+
+def revision_stats(area_code=None, date_from=None, date_to=None, by_area=True):
+    # 予報日が近づくにつれて値がどう動いたかを、地域 × リードタイム（何日前の予報か）ごとに集計する
+    batch_conditions = []
+    params = [time.localtime().tm_gmtoff] * 2
+    if area_code is not None:
+        batch_conditions.append('area_code = ?')
+        params.append(area_code)
+    batch_where = 'WHERE ' + ' AND '.join(batch_conditions) if batch_conditions else ''
+    
+    conditions = ['b.rn = 1']
+    if date_from is not None:
+        conditions.append('f.forecast_date >= ?')
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append('f.forecast_date <= ?')
+        params.append(date_to)
+    where = 'WHERE ' + ' AND '.join(conditions)
+    group = 'area_code, lead_days' if by_area else 'lead_days'
+    area_column = 'area_code' if by_area else 'NULL AS area_code'
+
+    grade_columns = ',\n'.join(
+        f'''COUNT(*) FILTER (WHERE reliability = '{grade}') AS samples_{grade.lower()},
+                   AVG(weather_code / 100 = final_weather_code / 100)
+                       FILTER (WHERE reliability = '{grade}') AS hit_rate_{grade.lower()}'''
+        for grade in RELIABILITY_GRADES
+    )
+
+    with connection() as conn:
+        rows = conn.execute(f'''
+            WITH batches AS (
+                -- 同じ日に何度も取得していても、地域ごとにその日最後のバッチだけを使う
+                SELECT batch_id, area_code, fetched_at,
+                       (fetched_at + ?) / {DAY_SECONDS} AS fetch_day,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY area_code, (fetched_at + ?) / {DAY_SECONDS}
+                           ORDER BY fetched_at DESC, batch_id DESC
+                       ) AS rn
+                FROM fetch_batches
+                {batch_where}
+            ),
+            per_lead AS (
+                SELECT b.area_code, f.forecast_date,
+                       CAST(julianday(f.forecast_date) - {UNIX_EPOCH_JULIAN_DAY} AS INTEGER) - b.fetch_day AS lead_days,
+                       {_integer('f.weather_code')} AS weather_code,
+                       {_integer('f.pop')} AS pop,
+                       {_integer('f.temp_min')} AS temp_min,
+                       {_integer('f.temp_max')} AS temp_max,
+                       f.reliability
+                FROM batches b JOIN forecasts f ON f.batch_id = b.batch_id
+                {where}
+            ),
+            samples AS (
+                -- 窓は1種類の並べ替えだけで済むようにそろえる（LEAD はひとつ前の発表を指す）
+                SELECT *,
+                       {_final('weather_code')} AS final_weather_code,
+                       {_final('pop')} AS final_pop,
+                       {_final('temp_min')} AS final_temp_min,
+                       {_final('temp_max')} AS final_temp_max,
+                       MIN(lead_days) OVER whole AS final_lead_days,
+                       LEAD(lead_days) OVER w AS prev_lead_days,
+                       LEAD(weather_code) OVER w AS prev_weather_code,
+                       LEAD(pop) OVER w AS prev_pop,
+                       LEAD(temp_min) OVER w AS prev_temp_min,
+                       LEAD(temp_max) OVER w AS prev_temp_max
+                FROM per_lead
+                WHERE lead_days >= 0
+                WINDOW w AS (PARTITION BY area_code, forecast_date ORDER BY lead_days),
+                       whole AS (w ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+            )
+            SELECT {area_column}, lead_days,
+                   COUNT(*) AS samples,
+                   AVG(ABS(temp_max - final_temp_max)) AS temp_max_mae,
+                   AVG(temp_max - final_temp_max) AS temp_max_bias,
+                   AVG(ABS(temp_min - final_temp_min)) AS temp_min_mae,
+                   AVG(temp_min - final_temp_min) AS temp_min_bias,
+                   AVG(ABS(pop - final_pop)) AS pop_mae,
+                   AVG(weather_code IS NOT prev_weather_code OR pop IS NOT prev_pop
+                       OR temp_min IS NOT prev_temp_min OR temp_max IS NOT prev_temp_max)
+                       FILTER (WHERE prev_lead_days IS NOT NULL) AS revision_rate,
+                   {grade_columns}
+            FROM samples
+            -- 確定値そのもの（最も新しい予報）は比較相手なので標本から外す
+            WHERE lead_days > final_lead_days
+            GROUP BY {group}
+            ORDER BY {group}
+        ''', params).fetchall()
+    return [dict(row) for row in rows]
+
+
+def format_stat(value, digits=1, percent=False):
+    if value is None:
+        return "--"
+    if percent:
+        return f"{value * 100:.0f}%"
+    return f"{value:.{digits}f}"
+
+
+def format_table(stats):
+    header = (f"{'地域':<8} {'何日前':>6} {'件数':>6} {'最高誤差':>8} {'最低誤差':>8} "
+              f"{'降水誤差':>8} {'改訂率':>6} {'的中A':>6} {'的中B':>6} {'的中C':>6}")
+    lines = [header]
+    for row in stats:
+        lines.append(
+            f"{row['area_code'] or '全地域':<8} {row['lead_days']:>6} {row['samples']:>6} "
+            f"{format_stat(row['temp_max_mae']):>8} {format_stat(row['temp_min_mae']):>8} "
+            f"{format_stat(row['pop_mae']):>8} {format_stat(row['revision_rate'], percent=True):>6} "
+            f"{format_stat(row['hit_rate_a'], percent=True):>6} "
+            f"{format_stat(row['hit_rate_b'], percent=True):>6} "
+            f"{format_stat(row['hit_rate_c'], percent=True):>6}"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="保存済みの予報履歴から、リードタイムごとの予報の改訂と精度を集計する")
+    parser.add_argument("--area", help="地域コード（省略時は全地域）")
+    parser.add_argument("--from", dest="date_from", help="対象とする予報日の開始 (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="対象とする予報日の終了 (YYYY-MM-DD)")
+    parser.add_argument("--overall", action="store_true", help="地域をまとめてリードタイムごとに集計する")
+    args = parser.parse_args()
+
+    init_database()
+    stats = revision_stats(args.area, args.date_from, args.date_to, by_area=not args.overall)
+    print(format_table(stats) if stats else "集計できる予報履歴がありません")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import json
+import re
+import time
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+from database import get_area_names, init_database, save_forecast_batches
+from forecast_parser import parse_forecast_areas, parse_forecast_data
+
+CHUNK_SIZE = 200
+JSON_SUFFIXES = {".json"}
+BUNDLE_SUFFIXES = {".ndjson", ".jsonl"}
+AREA_CODE_PATTERN = re.compile(r"(\d{6})")
+
+
+def iter_archive_files(paths):
+    for path in map(Path, paths):
+        if path.is_dir():
+            for child in sorted(path.rglob("*")):
+                if child.suffix in JSON_SUFFIXES | BUNDLE_SUFFIXES and child.is_file():
+                    yield child
+        elif path.is_file():
+            yield path
+
+
+def _unwrap(document, path):
+    # {"area_code": ..., "forecast": [...]} 形式と、ファイル名に地域コードを含む生の予報JSONの両方を受け付ける
+    if isinstance(document, dict):
+        return document.get("area_code"), document.get("forecast"), document
+    match = AREA_CODE_PATTERN.search(path.stem)
+    return (match.group(1) if match else None), document, {}
+
+
+def iter_documents(paths, errors):
+    # 壊れたファイルや行は errors に記録して読み飛ばし、残りの取り込みは続ける
+    for path in iter_archive_files(paths):
+        try:
+            with path.open(encoding="utf-8") as f:
+                if path.suffix not in BUNDLE_SUFFIXES:
+                    yield path, json.load(f)
+                    continue
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        document = json.loads(line)
+                    except ValueError as e:
+                        errors.append((f"{path}:{line_number}", f"JSONとして読めません: {e}"))
+                        continue
+                    yield path, document
+        except (OSError, ValueError) as e:
+            errors.append((str(path), f"JSONとして読めません: {e}"))
+
+
+def _fetched_at(wrapper, forecast_data, path):
+    value = wrapper.get("fetched_at")
+    if isinstance(value, (int, float)):
+        return int(value)
+    if value:
+        return int(datetime.fromisoformat(value).timestamp())
+    report_datetime = forecast_data[0].get("reportDatetime") if forecast_data else None
+    if report_datetime:
+        return int(datetime.fromisoformat(report_datetime).timestamp())
+    return int(path.stat().st_mtime)
+
+
+def iter_records(paths, area_names, errors):
+    for path, document in iter_documents(paths, errors):
+        area_code, forecast_data, wrapper = _unwrap(document, path)
+        if not area_code or not forecast_data:
+            errors.append((str(path), "地域コードまたは予報データがありません"))
+            continue
+        if not isinstance(forecast_data, list) or not all(isinstance(item, dict) for item in forecast_data):
+            errors.append((str(path), "予報データが気象庁の予報JSONの形式ではありません"))
+            continue
+        try:
+            record = {
+                "area_code": area_code,
+                "area_name": wrapper.get("area_name") or area_names.get(area_code),
+                "parsed_data": parse_forecast_data(forecast_data),
+                "report_datetime": forecast_data[0].get("reportDatetime"),
+                "sub_areas": parse_forecast_areas(forecast_data),
+                "fetched_at": _fetched_at(wrapper, forecast_data, path),
+            }
+        except (KeyError, IndexError, TypeError, ValueError, AttributeError) as e:
+            errors.append((str(path), f"予報データを解析できません: {e!r}"))
+            continue
+        yield record
+
+
+def iter_chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def ingest_archive(paths, chunk_size=CHUNK_SIZE, on_progress=None):
+    # 読み込み → 解析 → チャンク単位のトランザクション、をジェネレーターでつなぎ、
+    # 同時に保持するのは1チャンク分だけにする
+    report = {"documents": 0, "written": 0, "skipped": 0, "errors": []}
+    started = time.perf_counter()
+    records = iter_records(paths, get_area_names(), report["errors"])
+    for chunk in iter_chunks(records, chunk_size):
+        totals = save_forecast_batches(chunk)
+        report["documents"] += len(chunk)
+        report["written"] += totals["written"]
+        report["skipped"] += totals["skipped"]
+        if on_progress:
+            on_progress(report)
+    report["elapsed"] = time.perf_counter() - started
+    report["rows_per_sec"] = report["written"] / report["elapsed"] if report["elapsed"] else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="保存済みの気象庁予報JSON（.json / .ndjson）をまとめて取り込む")
+    parser.add_argument("paths", nargs="+", help="ファイルまたはディレクトリ")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    init_database()
+    report = ingest_archive(args.paths, chunk_size=args.chunk_size)
+    print(
+        f"{report['documents']} 件 / {report['elapsed']:.2f} 秒: "
+        f"保存 {report['written']} 行 ({report['rows_per_sec']:.0f} 行/秒), "
+        f"重複スキップ {report['skipped']} 行, エラー {len(report['errors'])} 件"
+    )
+    for path, error in report["errors"]:
+        print(f"  {path}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import re
+import unicodedata
+
+from database import iter_all_areas
+
+# ひらがな → ヘボン式ローマ字（拗音は2文字の組を先に引く）
+KANA_ROMAJI = {
+    "あ": "a", "い": "i", "う": "u", "え": "e", "お": "o",
+    "か": "ka", "き": "ki", "く": "ku", "け": "ke", "こ": "ko",
+    "さ": "sa", "し": "shi", "す": "su", "せ": "se", "そ": "so",
+    "た": "ta", "ち": "chi", "つ": "tsu", "て": "te", "と": "to",
+    "な": "na", "に": "ni", "ぬ": "nu", "ね": "ne", "の": "no",
+    "は": "ha", "ひ": "hi", "ふ": "fu", "へ": "he", "ほ": "ho",
+    "ま": "ma", "み": "mi", "む": "mu", "め": "me", "も": "mo",
+    "や": "ya", "ゆ": "yu", "よ": "yo",
+    "ら": "ra", "り": "ri", "る": "ru", "れ": "re", "ろ": "ro",
+    "わ": "wa", "ゐ": "i", "ゑ": "e", "を": "o", "ん": "n",
+    "が": "ga", "ぎ": "gi", "ぐ": "gu", "げ": "ge", "ご": "go",
+    "ざ": "za", "じ": "ji", "ず": "zu", "ぜ": "ze", "ぞ": "zo",
+    "だ": "da", "ぢ": "ji", "づ": "zu", "で": "de", "ど": "do",
+    "ば": "ba", "び": "bi", "ぶ": "bu", "べ": "be", "ぼ": "bo",
+    "ぱ": "pa", "ぴ": "pi", "ぷ": "pu", "ぺ": "pe", "ぽ": "po",
+    "ぁ": "a", "ぃ": "i", "ぅ": "u", "ぇ": "e", "ぉ": "o", "ゔ": "vu",
+    "きゃ": "kya", "きゅ": "kyu", "きょ": "kyo",
+    "しゃ": "sha", "しゅ": "shu", "しょ": "sho",
+    "ちゃ": "cha", "ちゅ": "chu", "ちょ": "cho",
+    "にゃ": "nya", "にゅ": "nyu", "にょ": "nyo",
+    "ひゃ": "hya", "ひゅ": "hyu", "ひょ": "hyo",
+    "みゃ": "mya", "みゅ": "myu", "みょ": "myo",
+    "りゃ": "rya", "りゅ": "ryu", "りょ": "ryo",
+    "ぎゃ": "gya", "ぎゅ": "gyu", "ぎょ": "gyo",
+    "じゃ": "ja", "じゅ": "ju", "じょ": "jo",
+    "びゃ": "bya", "びゅ": "byu", "びょ": "byo",
+    "ぴゃ": "pya", "ぴゅ": "pyu", "ぴょ": "pyo",
+}
+
+# 拗音の1文字目になりうる仮名。入力途中の「き」は「きょ」になるかもしれないので前方一致を緩める
+YOON_HEADS = set("きしちにひみりぎじびぴ")
+
+KANA_RE = re.compile(r"[ぁ-ゟ]")
+NAME_SEPARATORS = re.compile(r"[・\s()（）]+")
+LONG_VOWELS = (("ou", "o"), ("oo", "o"), ("uu", "u"))
+
+# 検索結果の並び順（府県予報区を先に出す）
+TYPE_ORDER = {"office": 0, "center": 1, "class10": 2}
+
+
+def normalize(text):
+    # 全角/半角・大小文字をそろえ、カタカナはひらがなに寄せる
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return "".join(chr(ord(ch) - 0x60) if "ァ" <= ch <= "ヶ" else ch for ch in text).replace("ー", "")
+
+
+def to_romaji(kana):
+    result = []
+    i = 0
+    while i < len(kana):
+        pair = KANA_ROMAJI.get(kana[i:i + 2])
+        if pair:
+            result.append(pair)
+            i += 2
+            continue
+        ch = kana[i]
+        if ch == "っ":
+            # 促音は次の子音を重ねる
+            following = KANA_ROMAJI.get(kana[i + 1:i + 3]) or KANA_ROMAJI.get(kana[i + 1:i + 2], "")
+            result.append(following[:1])
+        else:
+            result.append(KANA_ROMAJI.get(ch, ch))
+        i += 1
+    return "".join(result)
+
+
+def romaji_key(text):
+    # 長音の書き分け（Tokyo / toukyou / Osaka / oosaka）を吸収する
+    key = re.sub(r"[^a-z0-9]", "", text)
+    for long, short in LONG_VOWELS:
+        key = key.replace(long, short)
+    return key
+
+
+def index_keys(area_name, area_name_en):
+    name = normalize(area_name)
+    keys = {name}
+    keys.update(part for part in NAME_SEPARATORS.split(name) if part)
+    if KANA_RE.search(name):
+        keys.add(romaji_key(to_romaji(name)))
+
+    english = normalize(area_name_en)
+    if english:
+        keys.add(romaji_key(english))
+        keys.update(romaji_key(word) for word in re.split(r"[\s\-]+", english) if word)
+    keys.discard("")
+    return keys
+
+
+def query_keys(query):
+    text = normalize(query).strip()
+    if not text:
+        return []
+    keys = [text.replace(" ", "")]
+    if KANA_RE.search(text) or text.isascii():
+        romaji = romaji_key(to_romaji(text))
+        if romaji:
+            keys.append(romaji)
+            if text[-1] in YOON_HEADS and len(romaji) > 1:
+                keys.append(romaji[:-1])
+    return keys
+
+
+class TrieNode:
+    __slots__ = ("children", "codes")
+
+    def __init__(self):
+        self.children = {}
+        self.codes = set()
+
+
+class AreaSearchIndex:
+    # 各ノードにその接頭辞を持つ地域コードを持たせ、1回の検索をクエリ長ぶんの辿りで済ませる
+    def __init__(self, areas):
+        self.root = TrieNode()
+        self.areas = {area["area_code"]: area for area in areas}
+        for area in areas:
+            for key in index_keys(area["area_name"], area.get("area_name_en")):
+                self._insert(key, area["area_code"])
+        self.order = {
+            code: (TYPE_ORDER.get(area.get("area_type"), 9), code)
+            for code, area in self.areas.items()
+        }
+        self.offices_by_center = {}
+        for area in sorted(areas, key=lambda a: a["area_code"]):
+            if area.get("area_type") == "office":
+                self.offices_by_center.setdefault(area.get("parent_code"), []).append(area)
+
+    @classmethod
+    def from_database(cls):
+        return cls(list(iter_all_areas()))
+
+    def _insert(self, key, code):
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, TrieNode())
+            node.codes.add(code)
+
+    def _lookup(self, key):
+        node = self.root
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return set()
+        return node.codes
+
+    def search(self, query, limit=50):
+        codes = set()
+        for key in query_keys(query):
+            codes |= self._lookup(key)
+        return [self.areas[code] for code in sorted(codes, key=self.order.__getitem__)[:limit]]
+
+    def office_targets(self, query, limit=50):
+        # 予報は府県予報区単位なので、地方はその府県に、一次細分区域は親の府県に読み替える
+        targets = {}
+        for area in self.search(query, limit=None):
+            area_type = area.get("area_type")
+            if area_type == "center":
+                for office in self.offices_by_center.get(area["area_code"], []):
+                    targets.setdefault(office["area_code"], (office, None))
+            elif area_type == "class10":
+                office = self.areas.get(area.get("parent_code"))
+                if office and office["area_code"] not in targets:
+                    targets[office["area_code"]] = (office, area)
+            else:
+                targets[area["area_code"]] = (area, None)
+            if len(targets) >= limit:
+                break
+        return list(targets.values())[:limit]
@@ -0,0 +1,73 @@
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+from analytics import revision_stats
+
+ROWS_PER_SNAPSHOT = 8
+AREA_COUNT = 60
+SNAPSHOT_INTERVAL = 6 * 60 * 60
+DEFAULT_SIZES = [100_000, 1_000_000]
+
+
+def fill_forecasts(start, stop):
+    # 地域ごとに6時間おきの発表を並べ、各発表は取得日から8日分の予報を持つ
+    first_batch = start // ROWS_PER_SNAPSHOT
+    last_batch = stop // ROWS_PER_SNAPSHOT
+    with database.connection() as conn:
+        conn.execute('''
+            WITH RECURSIVE seq(s) AS (
+                SELECT ? UNION ALL SELECT s + 1 FROM seq WHERE s + 1 < ?
+            )
+            INSERT INTO fetch_batches (batch_id, area_code, area_name, fetched_at)
+            SELECT s + 1, printf('%06d', 10000 + (s % ?) * 1000), 'bench', 1767193200 + (s / ?) * ?
+            FROM seq
+        ''', (first_batch, last_batch, AREA_COUNT, AREA_COUNT, SNAPSHOT_INTERVAL))
+        conn.execute('''
+            WITH RECURSIVE seq(k) AS (
+                SELECT ? UNION ALL SELECT k + 1 FROM seq WHERE k + 1 < ?
+            )
+            INSERT INTO forecasts
+            (batch_id, forecast_date, weather_code, weather,
+             wind, wave, pop, temp_min, temp_max, reliability)
+            SELECT
+                k / ? + 1,
+                date(1767193200 + (k / ? / ?) * ?, 'unixepoch', 'localtime', '+' || (k % ?) || ' days'),
+                100 + abs(random() % 3) * 100, '晴れ', NULL, NULL,
+                abs(random() % 11) * 10, abs(random() % 5), 10 + abs(random() % 5),
+                char(65 + abs(random() % 3))
+            FROM seq
+        ''', (start, stop, ROWS_PER_SNAPSHOT, ROWS_PER_SNAPSHOT, AREA_COUNT,
+              SNAPSHOT_INTERVAL, ROWS_PER_SNAPSHOT))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="予報の改訂統計の集計時間を行数ごとに計測する")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    args = parser.parse_args()
+
+    database.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    database.init_database()
+
+    filled = 0
+    print(f"{'rows':>12} {'by area(s)':>12} {'overall(s)':>12} {'groups':>8}")
+    for size in sorted(args.sizes):
+        if size > filled:
+            fill_forecasts(filled, size)
+            filled = size
+        started = time.perf_counter()
+        stats = revision_stats()
+        by_area = time.perf_counter() - started
+        started = time.perf_counter()
+        revision_stats(by_area=False)
+        overall = time.perf_counter() - started
+        print(f"{size:>12,} {by_area:>12.2f} {overall:>12.2f} {len(stats):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import json
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+from archive_ingest import ingest_archive
+from stub_jma_server import load_forecast_payload
+
+
+def write_bundle(path, documents):
+    # 記録済みペイロードの reportDatetime をずらして、別々の発表として並べたアーカイブを作る
+    payload = load_forecast_payload()
+    base = datetime.fromisoformat(payload[0]["reportDatetime"])
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(documents):
+            report_datetime = (base + timedelta(hours=6 * i)).isoformat()
+            for part in payload:
+                part["reportDatetime"] = report_datetime
+            f.write(json.dumps({"area_code": "130000", "forecast": payload}, ensure_ascii=False))
+            f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="アーカイブ取り込みの速度とメモリ使用量を計測する")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--chunk-size", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        workdir = Path(tempfile.mkdtemp())
+        bundle = workdir / "archive.ndjson"
+        write_bundle(bundle, size)
+        database.DB_PATH = workdir / "bench.db"
+        database.init_database()
+
+        tracemalloc.start()
+        report = ingest_archive([bundle], chunk_size=args.chunk_size)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{size:>8,} documents ({bundle.stat().st_size / 1e6:.1f} MB): "
+              f"{report['written']:,} rows, {report['rows_per_sec']:,.0f} rows/sec, "
+              f"peak python memory {peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from area_search import AreaSearchIndex
+from database import _area_rows
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+AREA_COLUMNS = ("area_code", "area_name", "area_name_en", "area_type", "parent_code", "office_name")
+
+# 1文字ずつ打ち込む想定の入力
+QUERIES = ["とうきょう", "トウキョウ", "tokyo", "東京都", "いしかり", "ishikari", "おおさか", "kanto koshin", "伊豆諸島"]
+
+
+def keystrokes(queries):
+    return [query[:i] for query in queries for i in range(1, len(query) + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="地域検索の1キー入力あたりの時間を測る")
+    parser.add_argument("--area-json", type=Path, default=DATA_DIR / "area.json")
+    parser.add_argument("--copies", type=int, default=10, help="地域一覧を何倍に水増しして索引を作るか")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    area_data = json.loads(args.area_json.read_text(encoding="utf-8"))
+    areas = []
+    for copy in range(args.copies):
+        for row in _area_rows(area_data):
+            area = dict(zip(AREA_COLUMNS, row))
+            area["area_code"] = f"{copy}:{area['area_code']}"
+            if area["parent_code"]:
+                area["parent_code"] = f"{copy}:{area['parent_code']}"
+            areas.append(area)
+
+    started = time.perf_counter()
+    index = AreaSearchIndex(areas)
+    built = time.perf_counter() - started
+
+    inputs = keystrokes(QUERIES)
+    best = float("inf")
+    for _ in range(args.rounds):
+        started = time.perf_counter()
+        for query in inputs:
+            index.office_targets(query)
+        best = min(best, (time.perf_counter() - started) / len(inputs))
+
+    print(f"areas: {len(areas)}  index build: {built * 1000:.1f} ms")
+    print(f"keystrokes: {len(inputs)}  search: {best * 1e6:.1f} us/keystroke")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+from bulk_ingest import ingest_all
+from jma_client import JMAClient
+from stub_jma_server import StubJMAServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一括取り込みのスループットをスタブサーバーで計測する")
+    parser.add_argument("--delay", type=float, default=0.05, help="スタブサーバーの応答遅延（秒）")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with StubJMAServer(delay=args.delay) as server:
+        for workers in args.workers:
+            database.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+            database.init_database()
+            client = JMAClient(area_url=server.area_url, forecast_url=server.forecast_url,
+                               cache_dir=None, pool_size=max(workers, 4))
+            report = ingest_all(client, workers=workers, rate=args.rate, ttl=0)
+            print(f"workers={workers:>2}: {report['areas']} areas in {report['elapsed']:.2f}s "
+                  f"= {report['areas_per_sec']:.1f} areas/sec, written {report['written']} rows, "
+                  f"failed {len(report['failed'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+from bench_analytics import fill_forecasts
+from columnar_export import CHUNK_SIZE, FORMATS, export_forecasts, forecasts_dir, pq, read_forecasts, require_pyarrow
+
+
+def database_summary():
+    with database.connection() as conn:
+        rows = conn.execute('SELECT COUNT(*) FROM forecasts').fetchone()[0]
+        areas = {row[0] for row in conn.execute('SELECT DISTINCT area_code FROM fetch_batches')}
+        temp_max = conn.execute('SELECT SUM(temp_max) FROM forecasts').fetchone()[0]
+    return rows, areas, temp_max
+
+
+def verify(out_dir, file_format):
+    # 書き出したファイルを読み戻し、件数・地域コード（先頭の 0 を含む）・値が DB と一致するか確かめる
+    rows, areas, temp_max = database_summary()
+    table = read_forecasts(out_dir, file_format)
+    assert table.num_rows == rows, (file_format, table.num_rows, rows)
+    assert set(table.column("area_code").to_pylist()) == areas, file_format
+    assert sum(value for value in table.column("temp_max").to_pylist() if value is not None) == temp_max, file_format
+    assert table.column("batch_id").null_count == 0, file_format
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列指向ファイルへの書き出し速度を測り、読み戻して内容を確かめる")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    require_pyarrow()
+
+    database.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    database.init_database()
+    out_dir = Path(tempfile.mkdtemp())
+
+    # 半分を書き出してから残りを足し、続きからの書き出しも読み戻しで確かめる
+    half = args.rows // 2
+    fill_forecasts(0, half)
+    print(f"{'format':>8} {'step':>12} {'rows':>10} {'files':>6} {'sec':>7} {'rows/s':>10}")
+    for step, stop in (("full", half), ("incremental", args.rows)):
+        if stop > half:
+            fill_forecasts(half, stop)
+        for file_format in sorted(FORMATS):
+            report = export_forecasts(out_dir, file_format, chunk_size=args.chunk_size, full=step == "full")
+            verify(out_dir, file_format)
+            print(f"{file_format:>8} {step:>12} {report['rows']:>10,} {report['files']:>6} "
+                  f"{report['elapsed']:>7.2f} {report['rows_per_sec']:>10,.0f}")
+
+    # 区画の型を指定しない既定の読み込みでも、ファイル側の列と衝突せずに読めること
+    assert pq.read_table(forecasts_dir(out_dir, "parquet")).num_rows == database_summary()[0]
+    print("読み戻し: 件数・地域コード・値が DB と一致")
+
+
+if __name__ == "__main__":
+    main()
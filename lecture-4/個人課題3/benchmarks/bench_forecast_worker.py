@@ -0,0 +1,76 @@
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+from forecast_parser import parse_forecast_data
+from forecast_worker import LatestRequestRunner, fetch_and_store
+from jma_client import JMAClient
+from stub_jma_server import StubJMAServer
+
+
+def measure_handler_latency(runner, client, repeat):
+    # on_area_click から見た「ハンドラが戻るまで」と「描画コールバックまで」の時間
+    blocking = []
+    end_to_end = []
+    for i in range(repeat):
+        done = threading.Event()
+        started = time.perf_counter()
+        runner.submit(
+            lambda is_stale: fetch_and_store("130000", "東京都", parse_forecast_data, is_stale,
+                                             client=client, ttl=0),
+            on_done=lambda result: done.set(),
+            on_error=lambda e: done.set(),
+        )
+        blocking.append(time.perf_counter() - started)
+        done.wait(10)
+        end_to_end.append(time.perf_counter() - started)
+    return blocking, end_to_end
+
+
+def measure_rapid_clicks(runner, client, clicks):
+    rendered = []
+    finished = threading.Event()
+    codes = [f"{130000 + i:06d}" for i in range(clicks)]
+    for code in codes:
+        runner.submit(
+            lambda is_stale, code=code: fetch_and_store(code, code, parse_forecast_data, is_stale,
+                                                        client=client, ttl=0),
+            on_done=lambda result, code=code: (rendered.append(code), finished.set()),
+        )
+    finished.wait(10)
+    time.sleep(0.5)
+    return codes[-1], rendered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="バックグラウンド取得のUIハンドラ遅延を計測する")
+    parser.add_argument("--delay", type=float, default=0.2, help="スタブサーバーの応答遅延（秒）")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--clicks", type=int, default=5)
+    args = parser.parse_args()
+
+    database.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    database.init_database()
+
+    with StubJMAServer(delay=args.delay) as server:
+        runner = LatestRequestRunner()
+        client = JMAClient(area_url=server.area_url, forecast_url=server.forecast_url, cache_dir=None)
+        blocking, end_to_end = measure_handler_latency(runner, client, args.repeat)
+        print(f"handler blocking : median {statistics.median(blocking) * 1000:.3f} ms")
+        print(f"fetch+parse+save : median {statistics.median(end_to_end) * 1000:.1f} ms "
+              f"(server delay {args.delay * 1000:.0f} ms)")
+
+        expected, rendered = measure_rapid_clicks(runner, client, args.clicks)
+        status = "OK" if rendered == [expected] else "NG"
+        print(f"rapid clicks     : {args.clicks} submitted, rendered {rendered} [{status}]")
+
+
+if __name__ == "__main__":
+    main()
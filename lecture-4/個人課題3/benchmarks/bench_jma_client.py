@@ -0,0 +1,49 @@
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+
+from jma_client import JMAClient
+from stub_jma_server import StubJMAServer
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JMAClient の取得コストを条件ごとに計測する")
+    parser.add_argument("--delay", type=float, default=0.0, help="スタブサーバーの応答遅延（秒）")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with StubJMAServer(delay=args.delay) as server:
+        url = server.forecast_url.format("130000")
+
+        bare = timed(lambda: requests.get(url, timeout=10).json(), args.repeat)
+
+        client = JMAClient(area_url=server.area_url, forecast_url=server.forecast_url,
+                           cache_dir=tempfile.mkdtemp())
+        client.get_forecast("130000", ttl=0)
+        revalidated = timed(lambda: client.get_forecast("130000", ttl=0), args.repeat)
+        cached = timed(lambda: client.get_forecast("130000", ttl=3600), args.repeat)
+
+        print(f"requests.get (new connection) : {bare:.3f} ms")
+        print(f"session + 304 revalidation    : {revalidated:.3f} ms")
+        print(f"disk cache within TTL         : {cached:.3f} ms")
+        print(f"client stats {client.stats}, server 304 responses {server.not_modified}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+
+ROWS_PER_SNAPSHOT = 8
+AREA_COUNT = 60
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+
+
+def area_code(index):
+    return f"{10000 + index * 1000:06d}"
+
+
+def fill_forecasts(start, stop):
+    first_batch = start // ROWS_PER_SNAPSHOT
+    last_batch = stop // ROWS_PER_SNAPSHOT
+    with database.connection() as conn:
+        conn.execute('''
+            WITH RECURSIVE seq(s) AS (
+                SELECT ? UNION ALL SELECT s + 1 FROM seq WHERE s + 1 < ?
+            )
+            INSERT INTO fetch_batches (batch_id, area_code, area_name, fetched_at)
+            SELECT s + 1, printf('%06d', 10000 + (s % ?) * 1000), 'bench', 1700000000 + s
+            FROM seq
+        ''', (first_batch, last_batch, AREA_COUNT))
+        conn.execute('''
+            WITH RECURSIVE seq(k) AS (
+                SELECT ? UNION ALL SELECT k + 1 FROM seq WHERE k + 1 < ?
+            )
+            INSERT INTO forecasts
+            (batch_id, forecast_date, weather_code, weather,
+             wind, wave, pop, temp_min, temp_max, reliability)
+            SELECT
+                k / ? + 1,
+                date('2026-01-01', '+' || (k % ?) || ' days'),
+                '100', '晴れ', NULL, NULL, '10', '3', '12', 'A'
+            FROM seq
+        ''', (start, stop, ROWS_PER_SNAPSHOT, ROWS_PER_SNAPSHOT))
+
+
+def measure(repeat):
+    samples = []
+    for i in range(repeat):
+        code = area_code(i % AREA_COUNT)
+        started = time.perf_counter()
+        rows = database.get_latest_forecasts(code)
+        samples.append(time.perf_counter() - started)
+        assert len(rows) == ROWS_PER_SNAPSHOT
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_latest_forecasts のレイテンシを行数ごとに計測する")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--cache", action="store_true", help="forecast_cache を有効にしたまま測る（既定は SQL だけを測る）")
+    args = parser.parse_args()
+
+    database.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    database.init_database()
+    if not args.cache:
+        database.forecast_cache.maxsize = 0
+
+    filled = 0
+    print(f"{'rows':>12} {'median(ms)':>12} {'max(ms)':>10}")
+    for size in sorted(args.sizes):
+        if size > filled:
+            fill_forecasts(filled, size)
+            filled = size
+            # SQL で直接足したのでキャッシュは自分で捨てる
+            database.forecast_cache.clear()
+        median, worst = measure(args.repeat)
+        print(f"{size:>12,} {median * 1000:>12.3f} {worst * 1000:>10.3f}")
+    if args.cache:
+        print(database.forecast_cache.info())
+
+
+if __name__ == "__main__":
+    main()
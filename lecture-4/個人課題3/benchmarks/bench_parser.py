@@ -0,0 +1,156 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from forecast_parser import parse_forecast_data
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+# 比較用: 共通モジュール化する前に WeatherApp に置かれていた実装
+def legacy_parse_forecast_data(forecast_data):
+    result = {}
+
+    if len(forecast_data) >= 1:
+        three_day = forecast_data[0]
+        time_series = three_day.get("timeSeries", [])
+
+        if len(time_series) >= 1:
+            weather_ts = time_series[0]
+            time_defines = weather_ts.get("timeDefines", [])
+            areas = weather_ts.get("areas", [])
+
+            if areas:
+                area = areas[0]
+                weather_codes = area.get("weatherCodes", [])
+                weathers = area.get("weathers", [])
+                winds = area.get("winds", [])
+                waves = area.get("waves", [])
+
+                for i, time_def in enumerate(time_defines):
+                    date_str = time_def[:10]
+                    if date_str not in result:
+                        result[date_str] = {}
+                    result[date_str]["weather_code"] = weather_codes[i] if i < len(weather_codes) else ""
+                    result[date_str]["weather"] = weathers[i] if i < len(weathers) else ""
+                    result[date_str]["wind"] = winds[i] if i < len(winds) else ""
+                    result[date_str]["wave"] = waves[i] if i < len(waves) else ""
+
+        if len(time_series) >= 2:
+            pop_ts = time_series[1]
+            pop_times = pop_ts.get("timeDefines", [])
+            pop_areas = pop_ts.get("areas", [])
+
+            if pop_areas:
+                pops = pop_areas[0].get("pops", [])
+                for i, time_def in enumerate(pop_times):
+                    date_str = time_def[:10]
+                    if date_str not in result:
+                        result[date_str] = {}
+                    if "pop" not in result[date_str] and i < len(pops) and pops[i]:
+                        result[date_str]["pop"] = pops[i]
+
+        if len(time_series) >= 3:
+            temp_ts = time_series[2]
+            temp_times = temp_ts.get("timeDefines", [])
+            temp_areas = temp_ts.get("areas", [])
+
+            if temp_areas and len(temp_times) >= 2:
+                temps = temp_areas[0].get("temps", [])
+                tomorrow_date = temp_times[0][:10]
+                if tomorrow_date not in result:
+                    result[tomorrow_date] = {}
+                if len(temps) >= 1 and temps[0]:
+                    result[tomorrow_date]["temp_min"] = temps[0]
+                if len(temps) >= 2 and temps[1]:
+                    result[tomorrow_date]["temp_max"] = temps[1]
+
+    if len(forecast_data) >= 2:
+        weekly = forecast_data[1]
+        weekly_ts = weekly.get("timeSeries", [])
+
+        if len(weekly_ts) >= 1:
+            weather_ts = weekly_ts[0]
+            time_defines = weather_ts.get("timeDefines", [])
+            areas = weather_ts.get("areas", [])
+
+            if areas:
+                area = areas[0]
+                weather_codes = area.get("weatherCodes", [])
+                pops = area.get("pops", [])
+                reliabilities = area.get("reliabilities", [])
+
+                for i, time_def in enumerate(time_defines):
+                    date_str = time_def[:10]
+                    if date_str not in result:
+                        result[date_str] = {}
+                    if "weather_code" not in result[date_str] and i < len(weather_codes):
+                        result[date_str]["weather_code"] = weather_codes[i]
+                    if "pop" not in result[date_str] and i < len(pops) and pops[i]:
+                        result[date_str]["pop"] = pops[i]
+                    if i < len(reliabilities) and reliabilities[i]:
+                        result[date_str]["reliability"] = reliabilities[i]
+
+        if len(weekly_ts) >= 2:
+            temp_ts = weekly_ts[1]
+            temp_times = temp_ts.get("timeDefines", [])
+            temp_areas = temp_ts.get("areas", [])
+
+            if temp_areas:
+                area = temp_areas[0]
+                temps_min = area.get("tempsMin", [])
+                temps_max = area.get("tempsMax", [])
+
+                for i, time_def in enumerate(temp_times):
+                    date_str = time_def[:10]
+                    if date_str not in result:
+                        result[date_str] = {}
+                    if "temp_min" not in result[date_str] and i < len(temps_min) and temps_min[i]:
+                        result[date_str]["temp_min"] = temps_min[i]
+                    if "temp_max" not in result[date_str] and i < len(temps_max) and temps_max[i]:
+                        result[date_str]["temp_max"] = temps_max[i]
+
+    return result
+
+
+def load_payloads(paths):
+    return [json.loads(Path(path).read_text(encoding="utf-8")) for path in paths]
+
+
+def best_time(parse, payloads, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        for payload in payloads:
+            parse(payload)
+    return (time.perf_counter() - started) / (number * len(payloads))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記録済みの予報JSONで解析処理の速度を比較する")
+    parser.add_argument("paths", nargs="*", default=sorted(DATA_DIR.glob("forecast_*.json")))
+    parser.add_argument("--number", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.paths)
+    for payload in payloads:
+        assert parse_forecast_data(payload) == legacy_parse_forecast_data(payload)
+
+    # 交互に何度も測って最小値を採ることで、他プロセスの揺らぎを除く
+    legacy = current = float("inf")
+    for _ in range(args.rounds):
+        legacy = min(legacy, best_time(legacy_parse_forecast_data, payloads, args.number))
+        current = min(current, best_time(parse_forecast_data, payloads, args.number))
+
+    print(f"payloads: {len(payloads)}")
+    print(f"legacy : {legacy * 1e6:.2f} us/payload")
+    print(f"current: {current * 1e6:.2f} us/payload ({legacy / current:.2f}x)")
+    print(f"bulk ingest of 1,000 offices: {legacy * 1000 * 1000:.1f} ms -> {current * 1000 * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import database
+from bench_analytics import fill_forecasts
+
+
+def measure(label, read):
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = read()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<30} {elapsed:>8.2f} s {peak / 1024 / 1024:>10.1f} MiB  rows={rows:,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="dict(row) で全件を作る場合と ForecastRecord で流す場合の時間とメモリを比べる")
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    database.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    database.init_database()
+    fill_forecasts(0, args.rows)
+
+    measure("query_forecasts (dict)", lambda: len(database.query_forecasts(latest_only=False)))
+    measure("iter_query_forecasts (list)", lambda: len(list(database.iter_query_forecasts(latest_only=False))))
+    measure("iter_query_forecasts (stream)", lambda: sum(1 for _ in database.iter_query_forecasts(latest_only=False)))
+
+
+if __name__ == "__main__":
+    main()
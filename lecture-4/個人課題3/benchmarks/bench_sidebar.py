@@ -0,0 +1,139 @@
+import argparse
+import importlib.util
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+import flet as ft
+from flet.core.protocol import CommandEncoder
+
+import database
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+def load_app_module():
+    # ファイル名に空白があるので import 文では読めない。ft.app はモジュールを直接実行したときだけ動く
+    spec = importlib.util.spec_from_file_location("weather_app_v2", APP_DIR / "Weather forecast app v2.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class StubPage:
+    # クライアントへは送らず、更新されたコントロールの追加コマンドを組み立てて JSON にする時間と量だけ数える
+    def __init__(self, root):
+        self.root = root
+        self.serialize = 0.0
+        self.bytes = 0
+        self.controls = 0
+
+    def update(self, *controls):
+        started = time.perf_counter()
+        for control in controls or (self.root,):
+            commands = control._build_add_commands(index={}, added_controls=[])
+            payload = json.dumps(commands, cls=CommandEncoder, separators=(",", ":")).encode("utf-8")
+            self.bytes += len(payload)
+            self.controls += len(commands)
+        self.serialize += time.perf_counter() - started
+
+
+def replicate(area_data, copies):
+    # 同梱の area.json は一部の地方だけなので、コードをずらして複製し実際の件数（地方 11・府県 58）に近づける
+    result = {"centers": {}, "offices": {}, "class10s": {}}
+    for copy in range(copies):
+        def code(value):
+            return f"{copy}:{value}" if value and copy else value
+        for section, entries in result.items():
+            for key, info in area_data.get(section, {}).items():
+                info = dict(info)
+                if "parent" in info:
+                    info["parent"] = code(info["parent"])
+                if "children" in info:
+                    info["children"] = [code(child) for child in info["children"]]
+                entries[code(key)] = info
+    return result
+
+
+def new_app(app_module):
+    # WeatherApp.__init__ は画面全体の組み立てや定時更新の開始まで行うので、サイドバーに要る属性だけ用意する
+    app = app_module.WeatherApp.__new__(app_module.WeatherApp)
+    app.area_list = ft.ListView(expand=True, spacing=2)
+    app.page = StubPage(app.area_list)
+    app.area_tree = []
+    return app
+
+
+def first_paint(app_module):
+    # DB からの読み込み → WeatherApp.build_area_list → 送信する追加コマンドの組み立てと JSON 化
+    app = new_app(app_module)
+    started = time.perf_counter()
+    app.area_data = database.get_area_tree()
+    loaded = time.perf_counter()
+    app.build_area_list()
+    finished = time.perf_counter()
+    return app, {
+        "load": loaded - started,
+        "build": finished - loaded - app.page.serialize,
+        "serialize": app.page.serialize,
+        "total": finished - started,
+        "controls": app.page.controls,
+        "bytes": app.page.bytes,
+    }
+
+
+def expand_all(app):
+    # 地方をすべて開いたとき（WeatherApp.on_center_expand 経由）に府県タイルを作って送る分
+    page = StubPage(app.area_list)
+    started = time.perf_counter()
+    for tile in app.area_tree:
+        tile.page = page
+        tile.on_change(SimpleNamespace(data="true", control=tile))
+    finished = time.perf_counter()
+    return {
+        "load": 0.0,
+        "build": finished - started - page.serialize,
+        "serialize": page.serialize,
+        "total": finished - started,
+        "controls": page.controls,
+        "bytes": page.bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="地域一覧の初回描画（Python 側）にかかる時間と送信量を測る")
+    parser.add_argument("--area-json", type=Path, default=DATA_DIR / "area.json")
+    parser.add_argument("--copies", type=int, default=4, help="地域一覧を何倍に水増しするか")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    database.DB_PATH = Path(tempfile.mkdtemp()) / "bench.db"
+    database.init_database()
+    area_data = json.loads(args.area_json.read_text(encoding="utf-8"))
+    database.save_areas_from_json(replicate(area_data, args.copies))
+    app_module = load_app_module()
+
+    results = {"first paint": [], "expand all": []}
+    for _ in range(args.rounds):
+        app, report = first_paint(app_module)
+        results["first paint"].append(report)
+        results["expand all"].append(expand_all(app))
+
+    print(f"{'step':>12} {'load(ms)':>9} {'build(ms)':>10} {'serialize(ms)':>14} {'total(ms)':>10} "
+          f"{'controls':>9} {'payload(KB)':>12}")
+    for label, reports in results.items():
+        best = min(reports, key=lambda r: r["total"])
+        print(f"{label:>12} {best['load'] * 1000:>9.2f} {best['build'] * 1000:>10.2f} "
+              f"{best['serialize'] * 1000:>14.2f} {best['total'] * 1000:>10.2f} "
+              f"{best['controls']:>9} {best['bytes'] / 1024:>12.1f}")
+    print(f"地方 {len(app.area_tree)} 件・府県 {len(app.area_data['offices'])} 件")
+
+
+if __name__ == "__main__":
+    main()
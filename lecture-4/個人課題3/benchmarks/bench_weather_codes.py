@@ -0,0 +1,106 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from forecast_parser import parse_forecast_data
+from weather_codes import WEATHER_CODE_ICONS, WEATHER_CODE_TEXT, lookup_weather_code
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+RELIABILITY_INFO = {
+    "A": ("A", "#22C55E", "信頼度：高い"),
+    "B": ("B", "#F59E0B", "信頼度：普通"),
+    "C": ("C", "#EF4444", "信頼度：低い"),
+}
+
+
+# 比較用: 表を引く前にアプリ側で毎回計算していた実装
+def legacy_weather_icon(code):
+    return WEATHER_CODE_ICONS.get(code, "🌈")
+
+
+def legacy_weather_theme(code):
+    if not code:
+        return "sunny"
+    code_num = int(code) if code.isdigit() else 100
+    if code_num < 200:
+        return "sunny"
+    elif code_num < 300:
+        return "cloudy"
+    elif code_num < 400:
+        return "rainy"
+    else:
+        return "snowy"
+
+
+def legacy_reliability_info(rel):
+    if rel == "A":
+        return ("A", "#22C55E", "信頼度：高い")
+    elif rel == "B":
+        return ("B", "#F59E0B", "信頼度：普通")
+    elif rel == "C":
+        return ("C", "#EF4444", "信頼度：低い")
+    return ("", "", "")
+
+
+def legacy_render(cells):
+    for code, rel in cells:
+        legacy_weather_icon(code)
+        legacy_weather_theme(code)
+        legacy_reliability_info(rel)
+
+
+def current_render(cells):
+    for code, rel in cells:
+        info = lookup_weather_code(code)
+        info.icon
+        info.theme
+        RELIABILITY_INFO.get(rel, ("", "", ""))
+
+
+def load_cells(paths):
+    # 記録済みの予報の (天気コード, 信頼度) に公式表の全コードを足して、描画1回分の入力にする
+    cells = []
+    for path in paths:
+        parsed = parse_forecast_data(json.loads(Path(path).read_text(encoding="utf-8")))
+        cells.extend((day.get("weather_code", ""), day.get("reliability", "")) for day in parsed.values())
+    cells.extend((str(code), "") for code in WEATHER_CODE_TEXT)
+    return cells
+
+
+def best_time(render, cells, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        render(cells)
+    return (time.perf_counter() - started) / (number * len(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="天気コードの表示用情報の引き方を比較する")
+    parser.add_argument("paths", nargs="*", default=sorted(DATA_DIR.glob("forecast_*.json")))
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    cells = load_cells(args.paths)
+    for code, rel in cells:
+        info = lookup_weather_code(code)
+        assert info.theme == legacy_weather_theme(code)
+        assert legacy_weather_icon(code) in (info.icon, "🌈")
+
+    legacy = current = float("inf")
+    for _ in range(args.rounds):
+        legacy = min(legacy, best_time(legacy_render, cells, args.number))
+        current = min(current, best_time(current_render, cells, args.number))
+
+    print(f"cells: {len(cells)}")
+    print(f"legacy : {legacy * 1e9:.1f} ns/cell")
+    print(f"current: {current * 1e9:.1f} ns/cell ({legacy / current:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+
+
+class StubJMAServer:
+    # 気象庁APIの代わりに benchmarks/data の記録済みJSONを返すローカルサーバー
+    def __init__(self, delay=0.0, forecast_path=DATA_DIR / "forecast_130000.json",
+                 area_path=DATA_DIR / "area.json"):
+        self.delay = delay
+        self.forecast_body = Path(forecast_path).read_bytes()
+        self.area_body = Path(area_path).read_bytes()
+        self.requests = 0
+        self.not_modified = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server.requests += 1
+                if server.delay:
+                    time.sleep(server.delay)
+                if "/forecast/" in self.path:
+                    body = server.forecast_body
+                elif self.path.endswith("/area.json"):
+                    body = server.area_body
+                else:
+                    self.send_error(404)
+                    return
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def area_url(self):
+        return self.base_url + "/bosai/common/const/area.json"
+
+    @property
+    def forecast_url(self):
+        return self.base_url + "/bosai/forecast/data/forecast/{}.json"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def load_forecast_payload(path=DATA_DIR / "forecast_130000.json"):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
@@ -0,0 +1,130 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from database import init_database, save_areas_from_json, save_forecast_batches
+from forecast_parser import parse_forecast_areas, parse_forecast_data
+from jma_client import AREA_URL, FORECAST_TTL, FORECAST_URL, JMAClient, get_client
+
+WORKERS = 4
+REQUESTS_PER_SECOND = 5.0
+BATCH_SIZE = 20
+RETRIES = 3
+RETRY_BACKOFF = 0.5
+
+
+class RateLimiter:
+    # 全スレッド合計で1秒あたり rate 回までに発行間隔をそろえる
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+def office_targets(area_data):
+    return [(code, info.get("name")) for code, info in area_data.get("offices", {}).items()]
+
+
+def fetch_office(client, limiter, area_code, retries=RETRIES, ttl=FORECAST_TTL):
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            forecast_data = client.get_forecast(area_code, ttl=ttl)
+            report_datetime = forecast_data[0].get("reportDatetime") if forecast_data else None
+            return parse_forecast_data(forecast_data), report_datetime, parse_forecast_areas(forecast_data)
+        except (requests.RequestException, ValueError):
+            if attempt == retries:
+                raise
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+def ingest_all(client=None, area_data=None, workers=WORKERS, rate=REQUESTS_PER_SECOND,
+               batch_size=BATCH_SIZE, retries=RETRIES, ttl=FORECAST_TTL, targets=None):
+    client = client or get_client()
+    if targets is None:
+        if area_data is None:
+            area_data = client.get_area_data()
+            save_areas_from_json(area_data)
+        targets = office_targets(area_data)
+    limiter = RateLimiter(rate)
+
+    report = {"areas": len(targets), "written": 0, "skipped": 0, "failed": [], "results": {}}
+    pending = []
+
+    def flush():
+        totals = save_forecast_batches(pending)
+        report["written"] += totals["written"]
+        report["skipped"] += totals["skipped"]
+        report["results"].update(totals["results"])
+        pending.clear()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_office, client, limiter, code, retries, ttl): (code, name)
+            for code, name in targets
+        }
+        for future in as_completed(futures):
+            code, name = futures[future]
+            try:
+                parsed_data, report_datetime, sub_areas = future.result()
+            except Exception as e:
+                report["failed"].append((code, str(e)))
+                continue
+            pending.append({
+                "area_code": code,
+                "area_name": name,
+                "parsed_data": parsed_data,
+                "report_datetime": report_datetime,
+                "sub_areas": sub_areas,
+            })
+            if len(pending) >= batch_size:
+                flush()
+        if pending:
+            flush()
+
+    report["elapsed"] = time.perf_counter() - started
+    done = report["areas"] - len(report["failed"])
+    report["areas_per_sec"] = done / report["elapsed"] if report["elapsed"] else 0.0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="area.json の全府県予報区の予報をまとめて取り込む")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="1秒あたりの最大リクエスト数（0で無制限）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--retries", type=int, default=RETRIES)
+    parser.add_argument("--area-url", default=AREA_URL)
+    parser.add_argument("--forecast-url", default=FORECAST_URL)
+    args = parser.parse_args()
+
+    init_database()
+    client = JMAClient(area_url=args.area_url, forecast_url=args.forecast_url,
+                       pool_size=max(args.workers, 4))
+    report = ingest_all(client, workers=args.workers, rate=args.rate,
+                        batch_size=args.batch_size, retries=args.retries)
+    print(
+        f"{report['areas']} 地域 / {report['elapsed']:.2f} 秒 "
+        f"({report['areas_per_sec']:.1f} 地域/秒): "
+        f"保存 {report['written']} 行, 重複スキップ {report['skipped']} 行, 失敗 {len(report['failed'])} 件"
+    )
+    for code, error in report["failed"]:
+        print(f"  {code}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import argparse
+import json
+import shutil
+import time
+from pathlib import Path
+
+from database import connection, init_database
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = ds = pq = None
+
+EXPORT_DIR = Path(__file__).parent / "export"
+CHUNK_SIZE = 50000
+# 書き出し先の区画ディレクトリに置く続き位置。"_" 始まりなので pyarrow.dataset の読み込みでは無視される
+WATERMARK_FILE = "_watermark.json"
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+TIMEZONE = "Asia/Tokyo"
+
+# julianday() の 1970-01-01 に当たる値（予報日を epoch からの日数として読み出す）
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+
+def _integer(column):
+    return f"CASE WHEN typeof({column}) = 'integer' THEN {column} END"
+
+
+# 出力列と、それを作る SQL 式。数値化できなかった値は NULL にして型をそろえる。
+# area_code と month はディレクトリ名（hive 形式の区画）で表すのでファイルには入れない
+FORECAST_EXPORT_COLUMNS = [
+    ("area_name", "b.area_name"),
+    ("batch_id", "b.batch_id"),
+    ("fetched_at", "b.fetched_at"),
+    ("report_datetime", "b.report_datetime"),
+    ("forecast_date", f"CAST(julianday(f.forecast_date) - {UNIX_EPOCH_JULIAN_DAY} AS INTEGER)"),
+    ("weather_code", _integer("f.weather_code")),
+    ("weather", "f.weather"),
+    ("wind", "f.wind"),
+    ("wave", "f.wave"),
+    ("pop", _integer("f.pop")),
+    ("temp_min", _integer("f.temp_min")),
+    ("temp_max", _integer("f.temp_max")),
+    ("reliability", "f.reliability"),
+]
+
+AREA_EXPORT_COLUMNS = ["area_code", "area_name", "area_name_en", "area_type", "parent_code", "office_name"]
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("列指向ファイルへの書き出しには pyarrow が必要です: pip install pyarrow")
+
+
+def forecast_schema():
+    return pa.schema([
+        ("area_name", pa.string()),
+        ("batch_id", pa.int64()),
+        ("fetched_at", pa.timestamp("s", tz=TIMEZONE)),
+        ("report_datetime", pa.string()),
+        ("forecast_date", pa.date32()),
+        ("weather_code", pa.int16()),
+        ("weather", pa.string()),
+        ("wind", pa.string()),
+        ("wave", pa.string()),
+        ("pop", pa.int16()),
+        ("temp_min", pa.int16()),
+        ("temp_max", pa.int16()),
+        ("reliability", pa.string()),
+    ])
+
+
+def partition_schema():
+    # 区画の値は文字列のまま読む（推論させると 010000 が整数 10000 になる）
+    return pa.schema([("area_code", pa.string()), ("month", pa.string())])
+
+
+def area_schema():
+    return pa.schema([(name, pa.string()) for name in AREA_EXPORT_COLUMNS])
+
+
+def _record_batch(rows, schema):
+    # 列ごとにまとめて Arrow 配列にする（行ごとの dict は作らない）
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+def _open_writer(path, schema, file_format):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if file_format == "arrow":
+        return pa.ipc.new_file(str(path), schema)
+    return pq.ParquetWriter(str(path), schema, compression="zstd")
+
+
+def export_root(out_dir, file_format):
+    # 形式ごとに別のディレクトリにする（同じ区画に .parquet と .arrow が混ざると既定の読み込みが失敗する）
+    return Path(out_dir) / file_format
+
+
+def forecasts_dir(out_dir, file_format):
+    return export_root(out_dir, file_format) / "forecasts"
+
+
+def _watermark_path(out_dir, file_format):
+    return forecasts_dir(out_dir, file_format) / WATERMARK_FILE
+
+
+def _read_watermark(out_dir, file_format):
+    try:
+        return int(json.loads(_watermark_path(out_dir, file_format).read_text(encoding="utf-8"))["batch_id"])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def _write_watermark(out_dir, file_format, batch_id):
+    path = _watermark_path(out_dir, file_format)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(json.dumps({"batch_id": batch_id}), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def read_forecasts(out_dir=EXPORT_DIR, file_format="parquet"):
+    # 書き出した区画を1つの表として読み戻す（area_code / month は区画から文字列で復元する）
+    require_pyarrow()
+    base = forecasts_dir(out_dir, file_format)
+    dataset = ds.dataset(
+        str(base),
+        schema=pa.unify_schemas([forecast_schema(), partition_schema()]),
+        format="ipc" if file_format == "arrow" else "parquet",
+        partitioning=ds.partitioning(partition_schema(), flavor="hive"),
+    )
+    return dataset.to_table()
+
+
+def export_areas(out_dir=EXPORT_DIR, file_format="parquet"):
+    require_pyarrow()
+    schema = area_schema()
+    path = export_root(out_dir, file_format) / f"areas{FORMATS[file_format]}"
+    with connection() as conn:
+        rows = conn.execute(f'SELECT {", ".join(AREA_EXPORT_COLUMNS)} FROM areas ORDER BY area_code').fetchall()
+    writer = _open_writer(path, schema, file_format)
+    try:
+        if rows:
+            writer.write_batch(_record_batch(rows, schema))
+    finally:
+        writer.close()
+    return len(rows)
+
+
+def export_forecasts(out_dir=EXPORT_DIR, file_format="parquet", chunk_size=CHUNK_SIZE, full=False):
+    # 前回の書き出し以降に増えたバッチだけを、area_code=…/month=…/ の区画ごとのファイルに流し込む
+    # ファイル名は開始バッチで決まるので、途中で失敗しても次回の書き出しで同じファイルが上書きされる。
+    # 続き位置は書き出し先の中に持つので、別の --out や別の形式は最初から書き出される
+    require_pyarrow()
+    schema = forecast_schema()
+    base = forecasts_dir(out_dir, file_format)
+    started = time.perf_counter()
+    report = {"rows": 0, "files": 0, "from_batch": 0, "to_batch": 0}
+
+    if full:
+        shutil.rmtree(base, ignore_errors=True)
+
+    since = 0 if full else _read_watermark(out_dir, file_format)
+    with connection() as conn:
+        until = conn.execute('SELECT COALESCE(MAX(batch_id), 0) FROM fetch_batches').fetchone()[0]
+        report["from_batch"], report["to_batch"] = since, until
+        if until <= since:
+            report["elapsed"] = time.perf_counter() - started
+            report["rows_per_sec"] = 0
+            return report
+
+        cursor = conn.execute(f'''
+            SELECT b.area_code, strftime('%Y-%m', f.forecast_date) AS month,
+                   {", ".join(f"{expression} AS {name}" for name, expression in FORECAST_EXPORT_COLUMNS)}
+            FROM fetch_batches b JOIN forecasts f ON f.batch_id = b.batch_id
+            WHERE b.batch_id > ? AND b.batch_id <= ?
+            ORDER BY b.area_code, month, b.batch_id, f.forecast_date
+        ''', (since, until))
+
+        # 区画が切り替わるまで同じファイルに書き足す（並び順が区画順なので開くのは常に1ファイル）
+        writer = None
+        partition = None
+        pending = []
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                report["rows"] += len(rows)
+                for row in rows:
+                    key = (row[0], row[1])
+                    if key != partition:
+                        if pending:
+                            writer.write_batch(_record_batch(pending, schema))
+                            pending = []
+                        if writer is not None:
+                            writer.close()
+                        partition = key
+                        area_code, month = key
+                        path = (base / f"area_code={area_code}" / f"month={month}"
+                                / f"part-{since + 1:010d}{FORMATS[file_format]}")
+                        writer = _open_writer(path, schema, file_format)
+                        report["files"] += 1
+                    pending.append(row[2:])
+                if pending and (len(pending) >= chunk_size or not rows):
+                    writer.write_batch(_record_batch(pending, schema))
+                    pending = []
+                if not rows:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+
+    _write_watermark(out_dir, file_format, until)
+
+    report["elapsed"] = time.perf_counter() - started
+    report["rows_per_sec"] = report["rows"] / report["elapsed"] if report["elapsed"] else 0
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="予報履歴を地域・月ごとの Parquet / Arrow ファイルに書き出す")
+    parser.add_argument("--out", type=Path, default=EXPORT_DIR)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--full", action="store_true", help="前回の続きからではなく全バッチを書き出す")
+    args = parser.parse_args()
+
+    init_database()
+    areas = export_areas(args.out, args.format)
+    report = export_forecasts(args.out, args.format, chunk_size=args.chunk_size, full=args.full)
+    print(
+        f"地域 {areas} 件, 予報 {report['rows']:,} 行 → {report['files']} ファイル "
+        f"(バッチ {report['from_batch'] + 1}〜{report['to_batch']}, "
+        f"{report['elapsed']:.2f} 秒, {report['rows_per_sec']:.0f} 行/秒)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,248 @@
+import hashlib
+import json
+import queue
 import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 DB_PATH = Path(__file__).parent / "db" / "weather.db"
 
+POOL_SIZE = 8
+
+# 表示用に直近の予報をメモリに持つ件数と有効期限（秒）
+FORECAST_CACHE_SIZE = 64
+FORECAST_CACHE_TTL = 10 * 60
+
+CONNECTION_PRAGMAS = (
+    # auto_vacuum はファイルが初期化される前（WAL 切り替えより前）に設定したときだけ新規DBに効く。
+    # 既存DBでは何も変わらず、CLI の retention.py を実行したときに一度だけ VACUUM で切り替える
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class ConnectionPool:
+    def __init__(self, db_path, max_size=POOL_SIZE):
+        self.db_path = Path(db_path)
+        self.max_size = max_size
+        self._idle = queue.LifoQueue(maxsize=max_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _open(self):
+        with self._lock:
+            if not self._ready:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                self._ready = True
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        # 同じスレッド内の入れ子呼び出しは外側の接続とトランザクションを共有する
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        conn = self.acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self.release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool():
+    with _pools_lock:
+        pool = _pools.get(DB_PATH)
+        if pool is None:
+            pool = ConnectionPool(DB_PATH)
+            _pools[DB_PATH] = pool
+        return pool
+
+
+def connection():
+    return get_pool().connection()
+
+
+def close_all_connections():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
 
 def get_connection():
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_pool()._open()
 
 
-def init_database():
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS areas (
-            area_code TEXT PRIMARY KEY,
-            area_name TEXT NOT NULL,
-            area_name_en TEXT,
-            area_type TEXT,
-            parent_code TEXT,
-            office_name TEXT
-        )
-    ''')
+FETCHED_AT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+FORECAST_COLUMNS = '''
+    f.id, b.batch_id, b.area_code, b.area_name, f.forecast_date,
+    f.weather_code, f.weather, f.wind, f.wave, f.pop, f.temp_min, f.temp_max,
+    f.reliability, b.report_datetime,
+    datetime(b.fetched_at, 'unixepoch', 'localtime') AS fetched_at
+'''
+
+
+class RecordMixin:
+    # dict 向けに書かれた呼び出し側（row["pop"] / row.get("pop")）でもそのまま使えるようにする
+    __slots__ = ()
+
+    # 列名だけを引く（getattr のままだと "count" や "index" で tuple のメソッドが返ってしまう）
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+
+# FORECAST_COLUMNS / areas テーブルと同じ並びの軽量な行型（dict より小さく、行ごとの辞書を作らない）
+class ForecastRecord(RecordMixin, namedtuple("ForecastRecord", [
+    "id", "batch_id", "area_code", "area_name", "forecast_date",
+    "weather_code", "weather", "wind", "wave", "pop", "temp_min", "temp_max",
+    "reliability", "report_datetime", "fetched_at",
+])):
+    __slots__ = ()
+
+
+class AreaRecord(RecordMixin, namedtuple("AreaRecord", [
+    "area_code", "area_name", "area_name_en", "area_type", "parent_code", "office_name",
+])):
+    __slots__ = ()
+
+
+AREA_COLUMNS = ', '.join(AreaRecord._fields)
+
+
+def _record_factory(record_type):
+    make = record_type._make
+    return lambda cursor, row: make(row)
+
+
+def _iter_query(sql, params=(), record_type=None):
+    # 呼び出し側が途中で止めてもよいように、接続はスレッドに結び付けずプールから直接借りる
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        cursor = conn.cursor()
+        if record_type is not None:
+            cursor.row_factory = _record_factory(record_type)
+        yield from cursor.execute(sql, params)
+    finally:
+        pool.release(conn)
+
+
+def to_epoch(fetched_at):
+    if isinstance(fetched_at, int):
+        return fetched_at
+    return int(datetime.strptime(fetched_at, FETCHED_AT_FORMAT).timestamp())
+
+
+def format_epoch(epoch):
+    return datetime.fromtimestamp(epoch).strftime(FETCHED_AT_FORMAT)
+
+
+def to_number(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return value
+
+
+def _table_columns(conn, table):
+    return [row["name"] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _migrate_fetch_batches(conn):
+    # 旧スキーマ（forecasts に area_name / fetched_at を毎行持つ形）を fetch_batches へ正規化する
+    legacy = "fetched_at" in _table_columns(conn, "forecasts")
+    if legacy:
+        for index in ("idx_forecasts_area_code", "idx_forecasts_area_fetched",
+                      "idx_forecasts_date", "idx_forecasts_fetched"):
+            conn.execute(f'DROP INDEX IF EXISTS {index}')
+        conn.execute('ALTER TABLE forecasts RENAME TO forecasts_legacy')
     
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS forecasts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conn.execute('''
+        CREATE TABLE fetch_batches (
+            batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
             area_code TEXT NOT NULL,
             area_name TEXT,
+            fetched_at INTEGER NOT NULL,
+            FOREIGN KEY (area_code) REFERENCES areas (area_code)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_batches_area_fetched 
+        ON fetch_batches (area_code, fetched_at)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_batches_fetched 
+        ON fetch_batches (fetched_at)
+    ''')
+    conn.execute('''
+        CREATE TABLE forecasts (
+            id INTEGER PRIMARY KEY,
+            batch_id INTEGER NOT NULL,
             forecast_date TEXT NOT NULL,
             weather_code TEXT,
             weather TEXT,
@@ -41,212 +252,1010 @@ def init_database():
             temp_min TEXT,
             temp_max TEXT,
             reliability TEXT,
-            fetched_at TEXT NOT NULL,
-            FOREIGN KEY (area_code) REFERENCES areas (area_code)
+            FOREIGN KEY (batch_id) REFERENCES fetch_batches (batch_id)
         )
     ''')
+    conn.execute('''
+        CREATE INDEX idx_forecasts_batch 
+        ON forecasts (batch_id, forecast_date)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_forecasts_date 
+        ON forecasts (forecast_date)
+    ''')
     
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_forecasts_area_code 
-        ON forecasts (area_code)
+    if legacy:
+        conn.execute('''
+            INSERT INTO fetch_batches (area_code, area_name, fetched_at)
+            SELECT area_code, MAX(area_name), CAST(strftime('%s', fetched_at, 'utc') AS INTEGER)
+            FROM forecasts_legacy
+            GROUP BY area_code, fetched_at
+            ORDER BY fetched_at, MIN(id)
+        ''')
+        conn.execute('''
+            INSERT INTO forecasts 
+            (batch_id, forecast_date, weather_code, weather, wind, wave,
+             pop, temp_min, temp_max, reliability)
+            SELECT b.batch_id, f.forecast_date, f.weather_code, f.weather, f.wind, f.wave,
+                   f.pop, f.temp_min, f.temp_max, f.reliability
+            FROM forecasts_legacy f
+            JOIN fetch_batches b
+              ON b.area_code = f.area_code
+             AND b.fetched_at = CAST(strftime('%s', f.fetched_at, 'utc') AS INTEGER)
+            ORDER BY f.id
+        ''')
+        conn.execute('DROP TABLE forecasts_legacy')
+
+
+def _migrate_numeric_columns(conn):
+    # pop / temp_min / temp_max を数値型へ。INTEGER 型親和性なので数値化できない値は TEXT のまま残る
+    conn.execute('''
+        CREATE TABLE forecasts_numeric (
+            id INTEGER PRIMARY KEY,
+            batch_id INTEGER NOT NULL,
+            forecast_date TEXT NOT NULL,
+            weather_code TEXT,
+            weather TEXT,
+            wind TEXT,
+            wave TEXT,
+            pop INTEGER,
+            temp_min INTEGER,
+            temp_max INTEGER,
+            reliability TEXT,
+            FOREIGN KEY (batch_id) REFERENCES fetch_batches (batch_id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO forecasts_numeric
+        SELECT id, batch_id, forecast_date, weather_code, weather, wind, wave,
+               NULLIF(TRIM(pop), ''), NULLIF(TRIM(temp_min), ''), NULLIF(TRIM(temp_max), ''),
+               reliability
+        FROM forecasts
+    ''')
+    conn.execute('DROP TABLE forecasts')
+    conn.execute('ALTER TABLE forecasts_numeric RENAME TO forecasts')
+    conn.execute('''
+        CREATE INDEX idx_forecasts_batch 
+        ON forecasts (batch_id, forecast_date)
     ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_forecasts_date 
+    conn.execute('''
+        CREATE INDEX idx_forecasts_date 
         ON forecasts (forecast_date)
     ''')
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_forecasts_fetched 
-        ON forecasts (fetched_at)
+
+
+def _migrate_metadata(conn):
+    conn.execute('''
+        CREATE TABLE metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
     ''')
-    
-    conn.commit()
-    conn.close()
 
 
-def save_area(area_code, area_name, area_name_en=None, area_type=None, 
-              parent_code=None, office_name=None):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        INSERT OR REPLACE INTO areas 
-        (area_code, area_name, area_name_en, area_type, parent_code, office_name)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (area_code, area_name, area_name_en, area_type, parent_code, office_name))
-    
-    conn.commit()
-    conn.close()
+def _migrate_report_datetime(conn):
+    conn.execute('ALTER TABLE fetch_batches ADD COLUMN report_datetime TEXT')
+    conn.execute('''
+        CREATE INDEX idx_batches_area_report 
+        ON fetch_batches (area_code, report_datetime)
+    ''')
 
 
-def save_areas_from_json(area_data):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    centers = area_data.get("centers", {})
-    for code, info in centers.items():
-        cursor.execute('''
+def _migrate_area_views(conn):
+    conn.execute('''
+        CREATE TABLE area_views (
+            area_code TEXT PRIMARY KEY,
+            area_name TEXT,
+            last_viewed_at INTEGER NOT NULL,
+            pinned INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+
+def _migrate_sub_areas(conn):
+    conn.execute('''
+        CREATE TABLE sub_area_forecasts (
+            id INTEGER PRIMARY KEY,
+            batch_id INTEGER NOT NULL,
+            sub_area_code TEXT NOT NULL,
+            sub_area_name TEXT,
+            forecast_date TEXT NOT NULL,
+            weather_code TEXT,
+            weather TEXT,
+            wind TEXT,
+            wave TEXT,
+            pop INTEGER,
+            reliability TEXT,
+            FOREIGN KEY (batch_id) REFERENCES fetch_batches (batch_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_sub_area_code 
+        ON sub_area_forecasts (sub_area_code, batch_id)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_sub_area_batch 
+        ON sub_area_forecasts (batch_id)
+    ''')
+    conn.execute('''
+        CREATE TABLE point_temperatures (
+            id INTEGER PRIMARY KEY,
+            batch_id INTEGER NOT NULL,
+            point_code TEXT NOT NULL,
+            point_name TEXT,
+            forecast_date TEXT NOT NULL,
+            temp_min INTEGER,
+            temp_max INTEGER,
+            FOREIGN KEY (batch_id) REFERENCES fetch_batches (batch_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_point_code 
+        ON point_temperatures (point_code, batch_id)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_point_batch 
+        ON point_temperatures (batch_id)
+    ''')
+
+
+def _migrate_weather_code_integer(conn):
+    # 天気コードは "101" のような数字文字列なので INTEGER で持つ（表示は weather_codes の表で引く）
+    conn.execute('''
+        CREATE TABLE forecasts_coded (
+            id INTEGER PRIMARY KEY,
+            batch_id INTEGER NOT NULL,
+            forecast_date TEXT NOT NULL,
+            weather_code INTEGER,
+            weather TEXT,
+            wind TEXT,
+            wave TEXT,
+            pop INTEGER,
+            temp_min INTEGER,
+            temp_max INTEGER,
+            reliability TEXT,
+            FOREIGN KEY (batch_id) REFERENCES fetch_batches (batch_id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO forecasts_coded
+        SELECT id, batch_id, forecast_date, NULLIF(TRIM(weather_code), ''), weather, wind, wave,
+               pop, temp_min, temp_max, reliability
+        FROM forecasts
+    ''')
+    conn.execute('DROP TABLE forecasts')
+    conn.execute('ALTER TABLE forecasts_coded RENAME TO forecasts')
+    conn.execute('''
+        CREATE INDEX idx_forecasts_batch
+        ON forecasts (batch_id, forecast_date)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_forecasts_date
+        ON forecasts (forecast_date)
+    ''')
+
+    conn.execute('''
+        CREATE TABLE sub_area_forecasts_coded (
+            id INTEGER PRIMARY KEY,
+            batch_id INTEGER NOT NULL,
+            sub_area_code TEXT NOT NULL,
+            sub_area_name TEXT,
+            forecast_date TEXT NOT NULL,
+            weather_code INTEGER,
+            weather TEXT,
+            wind TEXT,
+            wave TEXT,
+            pop INTEGER,
+            reliability TEXT,
+            FOREIGN KEY (batch_id) REFERENCES fetch_batches (batch_id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO sub_area_forecasts_coded
+        SELECT id, batch_id, sub_area_code, sub_area_name, forecast_date,
+               NULLIF(TRIM(weather_code), ''), weather, wind, wave, pop, reliability
+        FROM sub_area_forecasts
+    ''')
+    conn.execute('DROP TABLE sub_area_forecasts')
+    conn.execute('ALTER TABLE sub_area_forecasts_coded RENAME TO sub_area_forecasts')
+    conn.execute('''
+        CREATE INDEX idx_sub_area_code
+        ON sub_area_forecasts (sub_area_code, batch_id)
+    ''')
+    conn.execute('''
+        CREATE INDEX idx_sub_area_batch
+        ON sub_area_forecasts (batch_id)
+    ''')
+
+
+SCHEMA_MIGRATIONS = [
+    _migrate_fetch_batches,
+    _migrate_numeric_columns,
+    _migrate_metadata,
+    _migrate_report_datetime,
+    _migrate_area_views,
+    _migrate_sub_areas,
+    _migrate_weather_code_integer,
+]
+
+
+def _apply_migrations(conn):
+    for version, migrate in enumerate(SCHEMA_MIGRATIONS, start=1):
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('PRAGMA user_version').fetchone()[0] < version:
+                migrate(conn)
+                conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+# fetch_batches を参照する子テーブル。バッチ削除時はここに並ぶ順に消す
+BATCH_CHILD_TABLES = ["forecasts", "sub_area_forecasts", "point_temperatures"]
+
+
+def delete_batches(conn, batch_ids_sql, params=()):
+    for table in BATCH_CHILD_TABLES:
+        conn.execute(f'DELETE FROM {table} WHERE batch_id IN ({batch_ids_sql})', params)
+    cursor = conn.execute(f'DELETE FROM fetch_batches WHERE batch_id IN ({batch_ids_sql})', params)
+    return cursor.rowcount
+
+
+def init_database():
+    with connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS areas (
+                area_code TEXT PRIMARY KEY,
+                area_name TEXT NOT NULL,
+                area_name_en TEXT,
+                area_type TEXT,
+                parent_code TEXT,
+                office_name TEXT
+            )
+        ''')
+        conn.commit()
+        _apply_migrations(conn)
+
+
+def save_area(area_code, area_name, area_name_en=None, area_type=None, 
+              parent_code=None, office_name=None):
+    with connection() as conn:
+        conn.execute('''
             INSERT OR REPLACE INTO areas 
             (area_code, area_name, area_name_en, area_type, parent_code, office_name)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (code, info.get("name"), info.get("enName"), "center", None, info.get("officeName")))
-    
+        ''', (area_code, area_name, area_name_en, area_type, parent_code, office_name))
+
+
+def get_metadata(key, default=None):
+    with connection() as conn:
+        row = conn.execute('SELECT value FROM metadata WHERE key = ?', (key,)).fetchone()
+    return row['value'] if row else default
+
+
+def set_metadata(key, value):
+    with connection() as conn:
+        conn.execute('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', (key, value))
+
+
+AREA_HASH_KEY = "area_json_hash"
+AREA_CHECKED_KEY = "area_json_checked_at"
+
+# areas へ書く行の形を変えたら上げる（保存済みのハッシュが一致しても書き直させるため）
+AREA_ROWS_VERSION = 2
+
+
+def area_data_hash(area_data):
+    payload = json.dumps(area_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _area_rows(area_data):
+    centers = area_data.get("centers", {})
     offices = area_data.get("offices", {})
+    for code, info in centers.items():
+        yield (code, info.get("name"), info.get("enName"), "center", None, info.get("officeName"))
     for code, info in offices.items():
-        cursor.execute('''
+        yield (code, info.get("name"), info.get("enName"), "office", info.get("parent"), info.get("officeName"))
+    # 一次細分区域。府県予報区と同じコードのもの（宗谷地方など）は府県予報区の行を残す
+    for code, info in area_data.get("class10s", {}).items():
+        if code in offices or code in centers:
+            continue
+        office_name = offices.get(info.get("parent"), {}).get("officeName")
+        yield (code, info.get("name"), info.get("enName"), "class10", info.get("parent"), office_name)
+
+
+def save_areas_from_json(area_data):
+    # area.json の内容が前回と同じなら書き込みを丸ごと省略する。
+    # 取得元（アプリ / bulk_ingest）によらず同じ値になるよう、生のバイト列ではなく解析後の内容から求める
+    content_hash = f"{AREA_ROWS_VERSION}:{area_data_hash(area_data)}"
+    if get_metadata(AREA_HASH_KEY) == content_hash:
+        return False
+    
+    with connection() as conn:
+        conn.executemany('''
             INSERT OR REPLACE INTO areas 
             (area_code, area_name, area_name_en, area_type, parent_code, office_name)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (code, info.get("name"), info.get("enName"), "office", info.get("parent"), info.get("officeName")))
+        ''', _area_rows(area_data))
+        conn.execute('INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)', (AREA_HASH_KEY, content_hash))
+    return True
+
+
+def mark_areas_checked():
+    # 取得し直した時刻を残す（起動時の再取得判定に使う）。内容が変わらなくても進める
+    set_metadata(AREA_CHECKED_KEY, str(int(time.time())))
+
+
+def areas_are_stale(ttl):
+    checked_at = get_metadata(AREA_CHECKED_KEY)
+    return checked_at is None or time.time() - int(checked_at) >= ttl
+
+
+def get_area_tree():
+    # areas テーブルから area.json と同じ形（centers / offices / class10s）を組み立てる
+    with connection() as conn:
+        rows = conn.execute('SELECT * FROM areas ORDER BY area_code').fetchall()
     
-    conn.commit()
-    conn.close()
+    tree = {"centers": {}, "offices": {}, "class10s": {}}
+    for row in rows:
+        entry = {"name": row['area_name'], "enName": row['area_name_en'], "children": []}
+        if row['area_type'] == "center":
+            entry["officeName"] = row['office_name']
+            tree["centers"][row['area_code']] = entry
+        elif row['area_type'] == "office":
+            entry["officeName"] = row['office_name']
+            entry["parent"] = row['parent_code']
+            tree["offices"][row['area_code']] = entry
+        elif row['area_type'] == "class10":
+            entry["parent"] = row['parent_code']
+            tree["class10s"][row['area_code']] = entry
+    
+    for kind, parents in (("offices", "centers"), ("class10s", "offices")):
+        for code, entry in tree[kind].items():
+            parent = tree[parents].get(entry["parent"])
+            if parent is not None:
+                parent["children"].append(code)
+    return tree
 
 
 def get_all_areas():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM areas ORDER BY area_code')
-    rows = cursor.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute('SELECT * FROM areas ORDER BY area_code').fetchall()
     return [dict(row) for row in rows]
 
 
+def iter_all_areas():
+    return _iter_query(f'SELECT {AREA_COLUMNS} FROM areas ORDER BY area_code', record_type=AreaRecord)
+
+
 def get_areas_by_type(area_type):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM areas WHERE area_type = ? ORDER BY area_code', (area_type,))
-    rows = cursor.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute('SELECT * FROM areas WHERE area_type = ? ORDER BY area_code', (area_type,)).fetchall()
     return [dict(row) for row in rows]
 
 
 def get_offices_by_center(center_code):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM areas WHERE parent_code = ? ORDER BY area_code', (center_code,))
-    rows = cursor.fetchall()
-    conn.close()
+    with connection() as conn:
+        rows = conn.execute('SELECT * FROM areas WHERE parent_code = ? ORDER BY area_code', (center_code,)).fetchall()
     return [dict(row) for row in rows]
 
 
+def _create_batch(conn, area_code, area_name, fetched_at, report_datetime=None):
+    cursor = conn.execute('''
+        INSERT INTO fetch_batches (area_code, area_name, fetched_at, report_datetime)
+        VALUES (?, ?, ?, ?)
+    ''', (area_code, area_name, fetched_at, report_datetime))
+    return cursor.lastrowid
+
+
+def _get_or_create_batch(conn, area_code, area_name, fetched_at):
+    row = conn.execute('''
+        SELECT batch_id FROM fetch_batches 
+        WHERE area_code = ? AND fetched_at = ?
+        ORDER BY batch_id DESC LIMIT 1
+    ''', (area_code, fetched_at)).fetchone()
+    if row:
+        return row['batch_id']
+    return _create_batch(conn, area_code, area_name, fetched_at)
+
+
 def save_forecast(area_code, area_name, forecast_date, weather_code=None,
                   weather=None, wind=None, wave=None, pop=None,
                   temp_min=None, temp_max=None, reliability=None):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    fetched_at = int(time.time())
     
-    cursor.execute('''
-        INSERT INTO forecasts 
-        (area_code, area_name, forecast_date, weather_code, weather, 
-         wind, wave, pop, temp_min, temp_max, reliability, fetched_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (area_code, area_name, forecast_date, weather_code, weather,
-          wind, wave, pop, temp_min, temp_max, reliability, fetched_at))
-    
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        batch_id = _get_or_create_batch(conn, area_code, area_name, fetched_at)
+        conn.execute('''
+            INSERT INTO forecasts 
+            (batch_id, forecast_date, weather_code, weather, 
+             wind, wave, pop, temp_min, temp_max, reliability)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (batch_id, forecast_date, weather_code, weather,
+              wind, wave, to_number(pop), to_number(temp_min), to_number(temp_max),
+              reliability))
+    forecast_cache.invalidate(area_code)
 
 
-def save_forecasts_from_parsed_data(area_code, area_name, parsed_data):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    fetched_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
+def _forecast_rows(batch_id, parsed_data):
     for forecast_date, data in parsed_data.items():
-        cursor.execute('''
-            INSERT INTO forecasts 
-            (area_code, area_name, forecast_date, weather_code, weather, 
-             wind, wave, pop, temp_min, temp_max, reliability, fetched_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            area_code,
-            area_name,
+        yield (
+            batch_id,
             forecast_date,
-            data.get("weather_code"),
+            to_number(data.get("weather_code")),
             data.get("weather"),
             data.get("wind"),
             data.get("wave"),
-            data.get("pop"),
-            data.get("temp_min"),
-            data.get("temp_max"),
+            to_number(data.get("pop")),
+            to_number(data.get("temp_min")),
+            to_number(data.get("temp_max")),
             data.get("reliability"),
-            fetched_at
-        ))
+        )
+
+
+def _sub_area_rows(batch_id, sub_areas):
+    for code, entry in sub_areas.get("areas", {}).items():
+        for forecast_date, data in entry["days"].items():
+            yield (
+                batch_id,
+                code,
+                entry.get("name"),
+                forecast_date,
+                to_number(data.get("weather_code")),
+                data.get("weather"),
+                data.get("wind"),
+                data.get("wave"),
+                to_number(data.get("pop")),
+                data.get("reliability"),
+            )
+
+
+def _point_rows(batch_id, sub_areas):
+    for code, entry in sub_areas.get("points", {}).items():
+        for forecast_date, data in entry["days"].items():
+            yield (
+                batch_id,
+                code,
+                entry.get("name"),
+                forecast_date,
+                to_number(data.get("temp_min")),
+                to_number(data.get("temp_max")),
+            )
+
+
+def _save_sub_areas(conn, batch_id, sub_areas):
+    conn.executemany('''
+        INSERT INTO sub_area_forecasts 
+        (batch_id, sub_area_code, sub_area_name, forecast_date, weather_code,
+         weather, wind, wave, pop, reliability)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', _sub_area_rows(batch_id, sub_areas))
+    conn.executemany('''
+        INSERT INTO point_temperatures 
+        (batch_id, point_code, point_name, forecast_date, temp_min, temp_max)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', _point_rows(batch_id, sub_areas))
+
+
+def save_forecasts_from_parsed_data(area_code, area_name, parsed_data,
+                                    report_datetime=None, dedupe=True, sub_areas=None,
+                                    fetched_at=None):
+    # 同じ reportDatetime の発表が保存済みなら書き込まない（冪等な取り込み）
+    fetched_at = to_epoch(fetched_at) if fetched_at is not None else int(time.time())
     
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        if dedupe and report_datetime:
+            exists = conn.execute('''
+                SELECT 1 FROM fetch_batches 
+                WHERE area_code = ? AND report_datetime = ?
+                LIMIT 1
+            ''', (area_code, report_datetime)).fetchone()
+            if exists:
+                return {"written": 0, "skipped": len(parsed_data), "batch_id": None,
+                        "report_datetime": report_datetime}
+        
+        batch_id = _create_batch(conn, area_code, area_name, fetched_at, report_datetime)
+        conn.executemany('''
+            INSERT INTO forecasts 
+            (batch_id, forecast_date, weather_code, weather, 
+             wind, wave, pop, temp_min, temp_max, reliability)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', _forecast_rows(batch_id, parsed_data))
+        if sub_areas:
+            _save_sub_areas(conn, batch_id, sub_areas)
+    forecast_cache.invalidate(area_code)
+    return {"written": len(parsed_data), "skipped": 0, "batch_id": batch_id,
+            "report_datetime": report_datetime}
+
+
+def save_forecast_batches(items, dedupe=True):
+    # items は save_forecasts_from_parsed_data の引数を持つ dict の並び。全体を1トランザクションで書く
+    # results には書き込みのあった地域ごとの結果（save_forecasts_from_parsed_data の戻り値）を入れる
+    totals = {"written": 0, "skipped": 0, "results": {}}
+    with connection():
+        for item in items:
+            result = save_forecasts_from_parsed_data(dedupe=dedupe, **item)
+            totals["written"] += result["written"]
+            totals["skipped"] += result["skipped"]
+            if result["written"]:
+                totals["results"][item["area_code"]] = result
+    # 内側の保存はまだ確定前なので、コミット後にもう一度消して確定前に読まれた分を残さない
+    for area_code in totals["results"]:
+        forecast_cache.invalidate(area_code)
+    return totals
+
+
+def get_area_names():
+    with connection() as conn:
+        rows = conn.execute('SELECT area_code, area_name FROM areas').fetchall()
+    return {row['area_code']: row['area_name'] for row in rows}
+
+
+LATEST_BATCH_SQL = '''
+    SELECT batch_id FROM fetch_batches WHERE area_code = ?
+    ORDER BY fetched_at DESC, batch_id DESC LIMIT 1
+'''
+
+BATCH_AT_SQL = '''
+    SELECT batch_id FROM fetch_batches WHERE area_code = ? AND fetched_at = ?
+    ORDER BY batch_id DESC LIMIT 1
+'''
+
+LATEST_FORECASTS_SQL = f'''
+    SELECT {FORECAST_COLUMNS}
+    FROM forecasts f JOIN fetch_batches b ON b.batch_id = f.batch_id
+    WHERE f.batch_id = ({LATEST_BATCH_SQL})
+    ORDER BY f.forecast_date
+'''
+
+FORECASTS_BY_DATE_SQL = f'''
+    SELECT {FORECAST_COLUMNS}
+    FROM forecasts f JOIN fetch_batches b ON b.batch_id = f.batch_id
+    WHERE f.batch_id = ({BATCH_AT_SQL})
+    ORDER BY f.forecast_date
+'''
+
+
+class ForecastCache:
+    # 地域ごとの予報を読み込み時に覚えておく LRU。保存した地域の分だけ消し、古いものは TTL で捨てる。
+    # 書き込みの確定前に読んだ結果を覚えてしまわないよう、地域ごとの世代番号が変わっていたら保存しない。
+    # 当たりのときは SQLite に触れず、覚えている ForecastRecord のタプルをそのまま返す。
+    # 別プロセスの書き込みは TTL で入れ替わるほか、アプリは再取得時に発表時刻が違えば invalidate する
+    def __init__(self, maxsize=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def _generation(self, area_code):
+        return self._epoch, self._generations.get(area_code, 0)
+
+    def get_or_load(self, area_code, key, load):
+        key = (DB_PATH, area_code, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+            generation = self._generation(area_code)
+
+        records = tuple(load())
+        if self.maxsize <= 0:
+            return records
+
+        with self._lock:
+            if self._generation(area_code) == generation:
+                self._entries[key] = (now, records)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+        return records
+
+    def invalidate(self, area_code):
+        with self._lock:
+            self._generations[area_code] = self._generations.get(area_code, 0) + 1
+            for key in [key for key in self._entries if key[1] == area_code]:
+                del self._entries[key]
+            self.stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+
+    def info(self):
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hit_rate": self.stats["hits"] / lookups if lookups else None,
+            }
+
+
+forecast_cache = ForecastCache()
 
 
 def get_latest_forecasts(area_code):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT MAX(fetched_at) as latest FROM forecasts WHERE area_code = ?
-    ''', (area_code,))
-    result = cursor.fetchone()
-    
-    if not result or not result['latest']:
-        conn.close()
-        return []
-    
-    latest_fetched = result['latest']
-    
-    cursor.execute('''
-        SELECT * FROM forecasts 
-        WHERE area_code = ? AND fetched_at = ?
-        ORDER BY forecast_date
-    ''', (area_code, latest_fetched))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    # (area_code, fetched_at) の複合インデックスで最新バッチを1回の問い合わせで引く。
+    # 結果は ForecastRecord のタプル（変更不可なのでキャッシュの中身をそのまま共有する）
+    return forecast_cache.get_or_load(area_code, None, lambda: iter_latest_forecasts(area_code))
+
+
+def iter_latest_forecasts(area_code):
+    return _iter_query(LATEST_FORECASTS_SQL, (area_code,), ForecastRecord)
 
 
 def get_forecasts_by_date(area_code, fetched_at):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT * FROM forecasts 
-        WHERE area_code = ? AND fetched_at = ?
-        ORDER BY forecast_date
-    ''', (area_code, fetched_at))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    epoch = to_epoch(fetched_at)
+    return forecast_cache.get_or_load(area_code, epoch, lambda: iter_forecasts_by_date(area_code, epoch))
+
+
+def iter_forecasts_by_date(area_code, fetched_at):
+    return _iter_query(FORECASTS_BY_DATE_SQL, (area_code, to_epoch(fetched_at)), ForecastRecord)
 
 
 def get_fetch_history(area_code):
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        SELECT DISTINCT fetched_at FROM forecasts 
-        WHERE area_code = ?
-        ORDER BY fetched_at DESC
-    ''', (area_code,))
-    
-    rows = cursor.fetchall()
-    conn.close()
-    return [row['fetched_at'] for row in rows]
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT DISTINCT fetched_at FROM fetch_batches 
+            WHERE area_code = ?
+            ORDER BY fetched_at DESC
+        ''', (area_code,)).fetchall()
+    return [format_epoch(row['fetched_at']) for row in rows]
 
 
 def get_all_fetch_dates():
-    conn = get_connection()
-    cursor = conn.cursor()
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT DISTINCT fetched_at FROM fetch_batches ORDER BY fetched_at DESC
+        ''').fetchall()
+    return [format_epoch(row['fetched_at']) for row in rows]
+
+
+def get_latest_sub_area_forecasts(sub_area_code):
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT s.*, b.area_code, b.report_datetime,
+                   datetime(b.fetched_at, 'unixepoch', 'localtime') AS fetched_at
+            FROM sub_area_forecasts s JOIN fetch_batches b ON b.batch_id = s.batch_id
+            WHERE s.sub_area_code = ? AND s.batch_id = (
+                SELECT x.batch_id FROM fetch_batches x
+                WHERE x.batch_id IN (SELECT batch_id FROM sub_area_forecasts WHERE sub_area_code = ?)
+                ORDER BY x.fetched_at DESC, x.batch_id DESC LIMIT 1
+            )
+            ORDER BY s.forecast_date
+        ''', (sub_area_code, sub_area_code)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_latest_point_temperatures(point_code):
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT p.*, b.area_code, b.report_datetime,
+                   datetime(b.fetched_at, 'unixepoch', 'localtime') AS fetched_at
+            FROM point_temperatures p JOIN fetch_batches b ON b.batch_id = p.batch_id
+            WHERE p.point_code = ? AND p.batch_id = (
+                SELECT x.batch_id FROM fetch_batches x
+                WHERE x.batch_id IN (SELECT batch_id FROM point_temperatures WHERE point_code = ?)
+                ORDER BY x.fetched_at DESC, x.batch_id DESC LIMIT 1
+            )
+            ORDER BY p.forecast_date
+        ''', (point_code, point_code)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_sub_areas(area_code):
+    # 府県予報区の最新スナップショットに含まれる細分区域・地点の一覧
+    with connection() as conn:
+        batch = conn.execute('''
+            SELECT batch_id FROM fetch_batches WHERE area_code = ?
+            ORDER BY fetched_at DESC, batch_id DESC LIMIT 1
+        ''', (area_code,)).fetchone()
+        if not batch:
+            return {"areas": [], "points": []}
+        areas = conn.execute('''
+            SELECT DISTINCT sub_area_code AS code, sub_area_name AS name
+            FROM sub_area_forecasts WHERE batch_id = ? ORDER BY sub_area_code
+        ''', (batch['batch_id'],)).fetchall()
+        points = conn.execute('''
+            SELECT DISTINCT point_code AS code, point_name AS name
+            FROM point_temperatures WHERE batch_id = ? ORDER BY point_code
+        ''', (batch['batch_id'],)).fetchall()
+    return {"areas": [dict(row) for row in areas], "points": [dict(row) for row in points]}
+
+
+def record_area_view(area_code, area_name):
+    with connection() as conn:
+        conn.execute('''
+            INSERT INTO area_views (area_code, area_name, last_viewed_at)
+            VALUES (?, ?, ?)
+            ON CONFLICT (area_code) DO UPDATE SET
+                area_name = excluded.area_name,
+                last_viewed_at = excluded.last_viewed_at
+        ''', (area_code, area_name, int(time.time())))
+
+
+def set_area_pinned(area_code, area_name, pinned):
+    with connection() as conn:
+        conn.execute('''
+            INSERT INTO area_views (area_code, area_name, last_viewed_at, pinned)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (area_code) DO UPDATE SET pinned = excluded.pinned
+        ''', (area_code, area_name, int(time.time()), int(bool(pinned))))
+
+
+def is_area_pinned(area_code):
+    with connection() as conn:
+        row = conn.execute('SELECT pinned FROM area_views WHERE area_code = ?', (area_code,)).fetchone()
+    return bool(row and row['pinned'])
+
+
+def get_refresh_targets(recent_days=7, limit=20):
+    # ピン留めした地域はすべて、それ以外は最近見た地域を新しい順に limit 件まで
+    since = int(time.time()) - recent_days * 24 * 60 * 60
+    with connection() as conn:
+        rows = conn.execute('''
+            SELECT area_code, area_name FROM area_views WHERE pinned = 1
+            UNION ALL
+            SELECT area_code, area_name FROM (
+                SELECT area_code, area_name FROM area_views
+                WHERE pinned = 0 AND last_viewed_at >= ?
+                ORDER BY last_viewed_at DESC
+                LIMIT ?
+            )
+        ''', (since, limit)).fetchall()
+    return [(row['area_code'], row['area_name']) for row in rows]
+
+
+LATEST_BATCH_CONDITION = '''
+    b.batch_id = (
+        SELECT x.batch_id FROM fetch_batches x WHERE x.area_code = b.area_code
+        ORDER BY x.fetched_at DESC, x.batch_id DESC LIMIT 1
+    )
+'''
+
+
+def _query_forecasts_sql(area_code=None, date_from=None, date_to=None,
+                         pop_at_least=None, pop_at_most=None,
+                         temp_max_at_least=None, temp_min_at_most=None,
+                         latest_only=True):
+    conditions = []
+    params = []
+    if area_code is not None:
+        conditions.append('b.area_code = ?')
+        params.append(area_code)
+    if date_from is not None:
+        conditions.append('f.forecast_date >= ?')
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append('f.forecast_date <= ?')
+        params.append(date_to)
+    numeric_filters = (
+        ('f.pop', '>=', pop_at_least),
+        ('f.pop', '<=', pop_at_most),
+        ('f.temp_max', '>=', temp_max_at_least),
+        ('f.temp_min', '<=', temp_min_at_most),
+    )
+    for column, op, value in numeric_filters:
+        if value is not None:
+            conditions.append(f"typeof({column}) IN ('integer', 'real') AND {column} {op} ?")
+            params.append(value)
+    if latest_only:
+        conditions.append(LATEST_BATCH_CONDITION)
     
-    cursor.execute('''
-        SELECT DISTINCT fetched_at FROM forecasts ORDER BY fetched_at DESC
-    ''')
+    where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+    sql = f'''
+        SELECT {FORECAST_COLUMNS}
+        FROM forecasts f JOIN fetch_batches b ON b.batch_id = f.batch_id
+        {where}
+        ORDER BY b.area_code, f.forecast_date
+    '''
+    return sql, params
+
+
+def query_forecasts(*args, **kwargs):
+    sql, params = _query_forecasts_sql(*args, **kwargs)
+    with connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return [dict(row) for row in rows]
+
+
+def iter_query_forecasts(*args, **kwargs):
+    # 全履歴の走査など大きな結果を、1行ずつ ForecastRecord で流す
+    sql, params = _query_forecasts_sql(*args, **kwargs)
+    return _iter_query(sql, params, ForecastRecord)
+
+
+def get_weekly_temperature_summary(area_code=None, date_from=None, date_to=None):
+    # 予報日ごとに最も新しいスナップショットの値を採用し、週単位で集計する
+    conditions = []
+    params = []
+    if area_code is not None:
+        conditions.append('b.area_code = ?')
+        params.append(area_code)
+    if date_from is not None:
+        conditions.append('f.forecast_date >= ?')
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append('f.forecast_date <= ?')
+        params.append(date_to)
+    where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
     
-    rows = cursor.fetchall()
-    conn.close()
-    return [row['fetched_at'] for row in rows]
+    with connection() as conn:
+        rows = conn.execute(f'''
+            WITH ranked AS (
+                SELECT b.area_code, f.forecast_date, f.pop, f.temp_min, f.temp_max,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY b.area_code, f.forecast_date
+                           ORDER BY b.fetched_at DESC, b.batch_id DESC
+                       ) AS rn
+                FROM forecasts f JOIN fetch_batches b ON b.batch_id = f.batch_id
+                {where}
+            )
+            SELECT area_code,
+                   strftime('%Y-W%W', forecast_date) AS week,
+                   MIN(forecast_date) AS week_start,
+                   MAX(temp_max) FILTER (WHERE typeof(temp_max) IN ('integer', 'real')) AS temp_max,
+                   MIN(temp_min) FILTER (WHERE typeof(temp_min) IN ('integer', 'real')) AS temp_min,
+                   AVG(pop) FILTER (WHERE typeof(pop) IN ('integer', 'real')) AS avg_pop,
+                   COUNT(*) AS days
+            FROM ranked
+            WHERE rn = 1
+            GROUP BY area_code, week
+            ORDER BY area_code, week
+        ''', params).fetchall()
+    return [dict(row) for row in rows]
+
+
+DIFF_FIELDS = ("weather_code", "weather", "wind", "wave", "pop", "temp_min", "temp_max", "reliability")
+
+# 差分（新値 - 旧値）に意味がある項目。weather_code は分類コードなので差は出さない
+NUMERIC_DIFF_FIELDS = ("pop", "temp_min", "temp_max")
+
+# 信頼度は A → B → C の順に低くなる
+RELIABILITY_RANKS = {"A": 1, "B": 2, "C": 3}
+RELIABILITY_RANK_SQL = "CASE {0} WHEN 'A' THEN 1 WHEN 'B' THEN 2 WHEN 'C' THEN 3 END"
+
+
+def _field_diff_sql(field):
+    # paired の1列ぶんを (予報日, 項目, 旧値, 新値) の行に開く。値が同じ日は出さない
+    if field in NUMERIC_DIFF_FIELDS:
+        delta = (f"CASE WHEN typeof(o_{field}) IN ('integer', 'real') "
+                 f"AND typeof(n_{field}) IN ('integer', 'real') THEN n_{field} - o_{field} END")
+    else:
+        delta = "NULL"
+    if field == "reliability":
+        downgrade = (f"COALESCE({RELIABILITY_RANK_SQL.format('n_reliability')} > "
+                     f"{RELIABILITY_RANK_SQL.format('o_reliability')}, 0)")
+    else:
+        downgrade = "0"
+    return f'''
+        SELECT area_code, forecast_date, '{field}' AS field,
+               o_{field} AS old_value, n_{field} AS new_value, {delta} AS delta,
+               {downgrade} AS downgrade,
+               CASE WHEN NOT has_old THEN 'added' WHEN NOT has_new THEN 'removed' ELSE 'changed' END AS change,
+               old_fetched_at, new_fetched_at
+        FROM paired WHERE o_{field} IS NOT n_{field}
+    '''
+
+
+def diff_snapshots(old_fetched_at, new_fetched_at, area_code=None):
+    # 各地域で「その時刻までに取得した最新のバッチ」どうしを比べ、変わった日・項目だけを返す
+    # area_code を省くと全地域をまとめて比較する。比較は SQL 側で済ませ、差分の行だけを Python に渡す
+    area_filter = 'WHERE area_code = ?' if area_code is not None else ''
+    params = [to_epoch(old_fetched_at), to_epoch(new_fetched_at)]
+    if area_code is not None:
+        params.append(area_code)
+
+    old_columns = ', '.join(f'o.{field} AS o_{field}' for field in DIFF_FIELDS)
+    new_columns = ', '.join(f'n.{field} AS n_{field}' for field in DIFF_FIELDS)
+    field_diffs = ' UNION ALL '.join(_field_diff_sql(field) for field in DIFF_FIELDS)
+
+    with connection() as conn:
+        rows = conn.execute(f'''
+            WITH bounds(old_at, new_at) AS (VALUES (?, ?)),
+            snapshots AS (
+                SELECT a.area_code,
+                       (SELECT x.batch_id FROM fetch_batches x, bounds
+                        WHERE x.area_code = a.area_code AND x.fetched_at <= bounds.old_at
+                        ORDER BY x.fetched_at DESC, x.batch_id DESC LIMIT 1) AS old_batch,
+                       (SELECT x.batch_id FROM fetch_batches x, bounds
+                        WHERE x.area_code = a.area_code AND x.fetched_at <= bounds.new_at
+                        ORDER BY x.fetched_at DESC, x.batch_id DESC LIMIT 1) AS new_batch
+                FROM (SELECT DISTINCT area_code FROM fetch_batches {area_filter}) a
+            ),
+            changed AS (
+                SELECT s.*, ob.fetched_at AS old_fetched_at, nb.fetched_at AS new_fetched_at
+                FROM snapshots s
+                -- 片方の時刻にまだバッチがない地域は、すべて added（または removed）として残す
+                LEFT JOIN fetch_batches ob ON ob.batch_id = s.old_batch
+                LEFT JOIN fetch_batches nb ON nb.batch_id = s.new_batch
+                WHERE s.old_batch IS NOT s.new_batch
+            ),
+            days AS (
+                SELECT c.area_code, c.old_batch, c.new_batch, c.old_fetched_at, c.new_fetched_at,
+                       f.forecast_date
+                FROM changed c JOIN forecasts f ON f.batch_id IN (c.old_batch, c.new_batch)
+                GROUP BY c.area_code, f.forecast_date
+            ),
+            paired AS (
+                SELECT d.area_code, d.forecast_date, d.old_fetched_at, d.new_fetched_at,
+                       o.id IS NOT NULL AS has_old, n.id IS NOT NULL AS has_new,
+                       {old_columns}, {new_columns}
+                FROM days d
+                LEFT JOIN forecasts o ON o.batch_id = d.old_batch AND o.forecast_date = d.forecast_date
+                LEFT JOIN forecasts n ON n.batch_id = d.new_batch AND n.forecast_date = d.forecast_date
+            )
+            SELECT area_code, forecast_date, field, old_value, new_value, delta, downgrade, change,
+                   datetime(old_fetched_at, 'unixepoch', 'localtime') AS old_fetched_at,
+                   datetime(new_fetched_at, 'unixepoch', 'localtime') AS new_fetched_at
+            FROM ({field_diffs})
+            ORDER BY area_code, forecast_date, field
+        ''', params).fetchall()
+    return [dict(row) for row in rows]
+
+
+def iter_forecast_revisions(area_code=None, date_from=None, date_to=None):
+    # 同じ予報日の値を取得順に並べ、LAG で直前のスナップショットと比べて変わった回だけを流す
+    conditions = []
+    params = []
+    if area_code is not None:
+        conditions.append('b.area_code = ?')
+        params.append(area_code)
+    if date_from is not None:
+        conditions.append('f.forecast_date >= ?')
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append('f.forecast_date <= ?')
+        params.append(date_to)
+    where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+    previous = ', '.join(f'LAG(f.{field}) OVER w AS prev_{field}' for field in DIFF_FIELDS)
+    changed = ' OR '.join(f'{field} IS NOT prev_{field}' for field in DIFF_FIELDS)
+
+    rows = _iter_query(f'''
+        WITH history AS (
+            SELECT b.area_code, f.forecast_date, b.fetched_at,
+                   LAG(b.fetched_at) OVER w AS prev_fetched_at,
+                   {', '.join(f'f.{field}' for field in DIFF_FIELDS)},
+                   {previous}
+            FROM forecasts f JOIN fetch_batches b ON b.batch_id = f.batch_id
+            {where}
+            WINDOW w AS (PARTITION BY b.area_code, f.forecast_date ORDER BY b.fetched_at, b.batch_id)
+        )
+        SELECT * FROM history
+        WHERE prev_fetched_at IS NOT NULL AND ({changed})
+        ORDER BY area_code, forecast_date, fetched_at
+    ''', params)
+    for row in rows:
+        changes = {
+            field: (row[f'prev_{field}'], row[field])
+            for field in DIFF_FIELDS
+            if row[f'prev_{field}'] != row[field]
+        }
+        old_rank = RELIABILITY_RANKS.get(row['prev_reliability'])
+        new_rank = RELIABILITY_RANKS.get(row['reliability'])
+        yield {
+            "area_code": row['area_code'],
+            "forecast_date": row['forecast_date'],
+            "prev_fetched_at": format_epoch(row['prev_fetched_at']),
+            "fetched_at": format_epoch(row['fetched_at']),
+            "changes": changes,
+            "downgrade": old_rank is not None and new_rank is not None and new_rank > old_rank,
+        }
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+def _first_area(time_series, index):
+    # timeSeries[index] の (timeDefines, 先頭エリア) を返す。エリアがなければ None
+    if len(time_series) <= index:
+        return None
+    series = time_series[index]
+    areas = series.get("areas")
+    if not areas:
+        return None
+    return series.get("timeDefines", []), areas[0]
+
+
+def _column(area, key, size, fill=""):
+    # 値の列を日付数に揃える。足りない分は fill で埋めて、ループ内の範囲チェックをなくす
+    values = area.get(key, [])
+    if len(values) < size:
+        values = values + [fill] * (size - len(values))
+    return values
+
+
+def parse_forecast_data(forecast_data):
+    """
+    APIデータを解析し、日付ごとの天気情報を整理する
+    
+    各 timeSeries を優先順（3日間予報 → 週間予報）に1回ずつ走査し、
+    日付ごとのレコードへ直接書き込む。
+
+    返り値:
+    {
+        "2025-12-18": {
+            "weather_code": "101",
+            "weather": "晴れ 朝晩 くもり",
+            "wind": "...",
+            "wave": "...",
+            "pop": "10",
+            "temp_min": "5",
+            "temp_max": "13",
+            "reliability": "A",
+        },
+        ...
+    }
+    """
+    result = {}
+    get_record = result.get
+    three_day = forecast_data[0].get("timeSeries", []) if len(forecast_data) >= 1 else []
+    weekly = forecast_data[1].get("timeSeries", []) if len(forecast_data) >= 2 else []
+
+    # 3日間予報: 天気、風、波
+    series = _first_area(three_day, 0)
+    if series:
+        time_defines, area = series
+        size = len(time_defines)
+        for time_def, code, weather, wind, wave in zip(
+            time_defines,
+            _column(area, "weatherCodes", size),
+            _column(area, "weathers", size),
+            _column(area, "winds", size),
+            _column(area, "waves", size),
+        ):
+            date = time_def[:10]
+            record = get_record(date)
+            if record is None:
+                record = result[date] = {}
+            record["weather_code"] = code
+            record["weather"] = weather
+            record["wind"] = wind
+            record["wave"] = wave
+
+    # 3日間予報: 降水確率（6時間ごと）。日付ごとに最初の値を使う
+    series = _first_area(three_day, 1)
+    if series:
+        time_defines, area = series
+        for time_def, pop in zip(time_defines, _column(area, "pops", len(time_defines))):
+            date = time_def[:10]
+            record = get_record(date)
+            if record is None:
+                record = result[date] = {}
+            if pop and "pop" not in record:
+                record["pop"] = pop
+
+    # 3日間予報: 気温（先頭の日付の最低・最高）
+    if len(three_day) >= 3:
+        temp_ts = three_day[2]
+        temp_times = temp_ts.get("timeDefines", [])
+        temp_areas = temp_ts.get("areas", [])
+        if temp_areas and len(temp_times) >= 2:
+            temps = temp_areas[0].get("temps", [])
+            date = temp_times[0][:10]
+            record = get_record(date)
+            if record is None:
+                record = result[date] = {}
+            if len(temps) >= 1 and temps[0]:
+                record["temp_min"] = temps[0]
+            if len(temps) >= 2 and temps[1]:
+                record["temp_max"] = temps[1]
+
+    # 週間予報: 天気、降水確率、信頼度（3日間予報にない項目のみ補完）
+    series = _first_area(weekly, 0)
+    if series:
+        time_defines, area = series
+        size = len(time_defines)
+        for time_def, code, pop, reliability in zip(
+            time_defines,
+            _column(area, "weatherCodes", size, fill=None),
+            _column(area, "pops", size),
+            _column(area, "reliabilities", size),
+        ):
+            date = time_def[:10]
+            record = get_record(date)
+            if record is None:
+                record = result[date] = {}
+            if code is not None and "weather_code" not in record:
+                record["weather_code"] = code
+            if pop and "pop" not in record:
+                record["pop"] = pop
+            if reliability:
+                record["reliability"] = reliability
+
+    # 週間予報: 最低・最高気温
+    series = _first_area(weekly, 1)
+    if series:
+        time_defines, area = series
+        size = len(time_defines)
+        for time_def, temp_min, temp_max in zip(
+            time_defines,
+            _column(area, "tempsMin", size),
+            _column(area, "tempsMax", size),
+        ):
+            date = time_def[:10]
+            record = get_record(date)
+            if record is None:
+                record = result[date] = {}
+            if temp_min and "temp_min" not in record:
+                record["temp_min"] = temp_min
+            if temp_max and "temp_max" not in record:
+                record["temp_max"] = temp_max
+
+    return result
+
+
+def _area_record(entries, area):
+    info = area.get("area", {})
+    code = info.get("code")
+    entry = entries.get(code)
+    if entry is None:
+        entry = entries[code] = {"name": info.get("name"), "days": {}}
+    return entry["days"]
+
+
+def _day(days, date):
+    record = days.get(date)
+    if record is None:
+        record = days[date] = {}
+    return record
+
+
+def parse_forecast_areas(forecast_data):
+    """
+    1回の取得で届く全ての細分区域（class10 / 週間予報区）とアメダス地点の予報を解析する
+
+    返り値:
+    {
+        "areas": {
+            "130010": {"name": "東京地方", "days": {"2026-01-10": {"weather_code": ..., "pop": ...}}},
+            ...
+        },
+        "points": {
+            "44132": {"name": "東京", "days": {"2026-01-11": {"temp_min": "2", "temp_max": "9"}}},
+            ...
+        },
+    }
+    """
+    areas = {}
+    points = {}
+    three_day = forecast_data[0].get("timeSeries", []) if len(forecast_data) >= 1 else []
+    weekly = forecast_data[1].get("timeSeries", []) if len(forecast_data) >= 2 else []
+
+    # 3日間予報: 天気、風、波
+    if len(three_day) >= 1:
+        time_defines = three_day[0].get("timeDefines", [])
+        size = len(time_defines)
+        for area in three_day[0].get("areas", []):
+            days = _area_record(areas, area)
+            for time_def, code, weather, wind, wave in zip(
+                time_defines,
+                _column(area, "weatherCodes", size),
+                _column(area, "weathers", size),
+                _column(area, "winds", size),
+                _column(area, "waves", size),
+            ):
+                record = _day(days, time_def[:10])
+                record["weather_code"] = code
+                record["weather"] = weather
+                record["wind"] = wind
+                record["wave"] = wave
+
+    # 3日間予報: 降水確率。日付ごとに最初の値を使う
+    if len(three_day) >= 2:
+        time_defines = three_day[1].get("timeDefines", [])
+        for area in three_day[1].get("areas", []):
+            days = _area_record(areas, area)
+            for time_def, pop in zip(time_defines, _column(area, "pops", len(time_defines))):
+                record = _day(days, time_def[:10])
+                if pop and "pop" not in record:
+                    record["pop"] = pop
+
+    # 3日間予報: 地点ごとの気温。00時が最低気温、09時が最高気温
+    if len(three_day) >= 3:
+        time_defines = three_day[2].get("timeDefines", [])
+        for area in three_day[2].get("areas", []):
+            days = _area_record(points, area)
+            for time_def, temp in zip(time_defines, _column(area, "temps", len(time_defines))):
+                if not temp:
+                    continue
+                key = "temp_min" if time_def[11:13] == "00" else "temp_max"
+                _day(days, time_def[:10]).setdefault(key, temp)
+
+    # 週間予報: 天気、降水確率、信頼度（3日間予報にない項目のみ補完）
+    if len(weekly) >= 1:
+        time_defines = weekly[0].get("timeDefines", [])
+        size = len(time_defines)
+        for area in weekly[0].get("areas", []):
+            days = _area_record(areas, area)
+            for time_def, code, pop, reliability in zip(
+                time_defines,
+                _column(area, "weatherCodes", size, fill=None),
+                _column(area, "pops", size),
+                _column(area, "reliabilities", size),
+            ):
+                record = _day(days, time_def[:10])
+                if code is not None and "weather_code" not in record:
+                    record["weather_code"] = code
+                if pop and "pop" not in record:
+                    record["pop"] = pop
+                if reliability:
+                    record["reliability"] = reliability
+
+    # 週間予報: 地点ごとの最低・最高気温
+    if len(weekly) >= 2:
+        time_defines = weekly[1].get("timeDefines", [])
+        size = len(time_defines)
+        for area in weekly[1].get("areas", []):
+            days = _area_record(points, area)
+            for time_def, temp_min, temp_max in zip(
+                time_defines,
+                _column(area, "tempsMin", size),
+                _column(area, "tempsMax", size),
+            ):
+                record = _day(days, time_def[:10])
+                if temp_min and "temp_min" not in record:
+                    record["temp_min"] = temp_min
+                if temp_max and "temp_max" not in record:
+                    record["temp_max"] = temp_max
+
+    return {"areas": areas, "points": points}
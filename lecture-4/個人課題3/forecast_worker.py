@@ -0,0 +1,49 @@
+import threading
+
+from database import save_forecasts_from_parsed_data
+from forecast_parser import parse_forecast_areas
+from jma_client import FORECAST_TTL, get_client
+
+
+def fetch_and_store(area_code, area_name, parse, is_stale=None, client=None, ttl=FORECAST_TTL):
+    forecast_data = (client or get_client()).get_forecast(area_code, ttl=ttl)
+    # 通信中に別の地域が選ばれていたら、解析と保存を省く
+    if is_stale and is_stale():
+        return None
+    parsed_data = parse(forecast_data)
+    report_datetime = forecast_data[0].get("reportDatetime") if forecast_data else None
+    return save_forecasts_from_parsed_data(area_code, area_name, parsed_data,
+                                           report_datetime=report_datetime,
+                                           sub_areas=parse_forecast_areas(forecast_data))
+
+
+class LatestRequestRunner:
+    # 最後に投入されたジョブの結果だけをコールバックへ渡す。古いジョブは結果ごと破棄する
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+
+    def submit(self, job, on_done, on_error=None):
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+
+        def is_stale():
+            return not self.is_current(generation)
+
+        def run():
+            try:
+                result = job(is_stale)
+            except Exception as e:
+                if on_error and not is_stale():
+                    on_error(e)
+                return
+            if not is_stale():
+                on_done(result)
+
+        threading.Thread(target=run, name=f"forecast-fetch-{generation}", daemon=True).start()
+        return generation
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+AREA_URL = "http://www.jma.go.jp/bosai/common/const/area.json"
+FORECAST_URL = "https://www.jma.go.jp/bosai/forecast/data/forecast/{}.json"
+
+CACHE_DIR = Path(__file__).parent / "cache"
+
+AREA_TTL = 24 * 60 * 60
+FORECAST_TTL = 5 * 60
+
+
+class JMAClient:
+    # 気象庁APIの共通取得クライアント。Session を使い回し、ETag / Last-Modified で再検証し、
+    # TTL 内の再取得はディスクキャッシュから返す
+    def __init__(self, area_url=AREA_URL, forecast_url=FORECAST_URL,
+                 cache_dir=CACHE_DIR, timeout=10, session=None, pool_size=16):
+        self.area_url = area_url
+        self.forecast_url = forecast_url
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {"cache": 0, "not_modified": 0, "network": 0}
+        self._lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.body", self.cache_dir / f"{key}.meta.json"
+
+    def _read_cache(self, url):
+        if not self.cache_dir:
+            return None, None
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            return body_path.read_bytes(), meta
+        except (OSError, ValueError):
+            return None, None
+
+    def _write_cache(self, url, content, meta):
+        if not self.cache_dir:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        body_path, meta_path = self._paths(url)
+        files = [(meta_path, json.dumps(meta).encode("utf-8"))]
+        if content is not None:
+            files.insert(0, (body_path, content))
+        for path, data in files:
+            tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+    def _count(self, status):
+        with self._lock:
+            self.stats[status] += 1
+
+    def fetch(self, url, ttl):
+        content, meta = self._read_cache(url)
+        now = time.time()
+        if content is not None and now - meta.get("checked_at", 0) < ttl:
+            self._count("cache")
+            return {"content": content, "status": "cache"}
+
+        headers = {}
+        if content is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and content is not None:
+            meta["checked_at"] = now
+            self._write_cache(url, None, meta)
+            self._count("not_modified")
+            return {"content": content, "status": "not_modified"}
+
+        response.raise_for_status()
+        self._write_cache(url, response.content, {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked_at": now,
+        })
+        self._count("network")
+        return {"content": response.content, "status": "network"}
+
+    def get_json(self, url, ttl):
+        return json.loads(self.fetch(url, ttl)["content"])
+
+    def fetch_area_data(self, ttl=AREA_TTL):
+        return self.fetch(self.area_url, ttl)
+
+    def get_area_data(self, ttl=AREA_TTL):
+        return self.get_json(self.area_url, ttl)
+
+    def get_forecast(self, area_code, ttl=FORECAST_TTL):
+        return self.get_json(self.forecast_url.format(area_code), ttl)
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client():
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = JMAClient()
+        return _default_client
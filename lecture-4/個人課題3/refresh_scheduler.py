@@ -0,0 +1,95 @@
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+
+from bulk_ingest import ingest_all
+from database import get_refresh_targets, init_database
+
+JST = timezone(timedelta(hours=9))
+
+# 気象庁の府県天気予報の定時発表（日本時間）
+PUBLISH_HOURS = (5, 11, 17)
+# 発表直後はまだ配信されていないことがあるので少し待ってから取りに行く
+PUBLISH_DELAY = timedelta(minutes=10)
+
+RECENT_DAYS = 7
+MAX_RECENT_AREAS = 20
+
+
+def next_refresh_time(now=None):
+    now = (now or datetime.now(JST)).astimezone(JST)
+    day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in (0, 1):
+        for hour in PUBLISH_HOURS:
+            candidate = day + timedelta(days=offset, hours=hour) + PUBLISH_DELAY
+            if candidate > now:
+                return candidate
+
+
+def refresh_once(client=None, recent_days=RECENT_DAYS, limit=MAX_RECENT_AREAS):
+    targets = get_refresh_targets(recent_days=recent_days, limit=limit)
+    if not targets:
+        return {"areas": 0, "written": 0, "skipped": 0, "failed": [], "results": {}, "elapsed": 0.0, "areas_per_sec": 0.0}
+    # 定時発表の直後なのでキャッシュの TTL は使わず、必ず再検証する
+    return ingest_all(client, targets=targets, ttl=0)
+
+
+class RefreshScheduler:
+    def __init__(self, client=None, on_refresh=None, recent_days=RECENT_DAYS, limit=MAX_RECENT_AREAS):
+        self.client = client
+        self.on_refresh = on_refresh
+        self.recent_days = recent_days
+        self.limit = limit
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="forecast-refresh", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = (next_refresh_time() - datetime.now(JST)).total_seconds()
+            if self._stop.wait(max(wait, 0)):
+                break
+            try:
+                report = refresh_once(self.client, self.recent_days, self.limit)
+                if self.on_refresh:
+                    self.on_refresh(report)
+            except Exception as e:
+                print(f"定時更新に失敗しました: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="気象庁の定時発表に合わせてピン留め・最近見た地域を更新する")
+    parser.add_argument("--once", action="store_true", help="待たずに1回だけ更新して終了する")
+    parser.add_argument("--recent-days", type=int, default=RECENT_DAYS)
+    parser.add_argument("--limit", type=int, default=MAX_RECENT_AREAS)
+    args = parser.parse_args()
+
+    init_database()
+
+    def print_report(report):
+        print(f"[{datetime.now(JST):%Y-%m-%d %H:%M}] {report['areas']} 地域を更新: "
+              f"保存 {report['written']} 行, 重複スキップ {report['skipped']} 行, 失敗 {len(report['failed'])} 件")
+
+    if args.once:
+        print_report(refresh_once(recent_days=args.recent_days, limit=args.limit))
+        return
+
+    scheduler = RefreshScheduler(on_refresh=print_report, recent_days=args.recent_days, limit=args.limit)
+    scheduler.start()
+    print(f"次回の更新: {next_refresh_time():%Y-%m-%d %H:%M} JST")
+    try:
+        scheduler._thread.join()
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
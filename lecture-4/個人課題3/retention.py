@@ -0,0 +1,148 @@
+import argparse
+import threading
+import time
+
+from database import connection, delete_batches, forecast_cache, init_database
+
+DAY_SECONDS = 24 * 60 * 60
+
+RETENTION_POLICY = {
+    # 地域ごとに必ず残す最新スナップショット数
+    "keep_latest": 10,
+    # これより古いスナップショットは1日1件（その日の最後）に間引く
+    "daily_after_days": 7,
+    # これより古いスナップショットは削除する（None なら無期限）
+    "expire_after_days": 90,
+}
+
+MAINTENANCE_INTERVAL = 6 * 60 * 60
+# アプリ起動直後の書き込み（閲覧履歴・予報の保存）とぶつからないよう、初回の保守は少し待ってから行う
+MAINTENANCE_INITIAL_DELAY = 10 * 60
+
+
+def _database_bytes(conn):
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    return page_size * page_count
+
+
+def apply_retention(policy=None, now=None):
+    policy = {**RETENTION_POLICY, **(policy or {})}
+    now = int(now if now is not None else time.time())
+    daily_cutoff = now - policy["daily_after_days"] * DAY_SECONDS
+    expire_after = policy["expire_after_days"]
+    expire_cutoff = now - expire_after * DAY_SECONDS if expire_after is not None else None
+
+    with connection() as conn:
+        conn.execute('DROP TABLE IF EXISTS temp.expired_batches')
+        conn.execute('''
+            CREATE TEMP TABLE expired_batches AS
+            WITH ranked AS (
+                SELECT batch_id, fetched_at,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY area_code
+                           ORDER BY fetched_at DESC, batch_id DESC
+                       ) AS recent_rank,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY area_code, date(fetched_at, 'unixepoch', 'localtime')
+                           ORDER BY fetched_at DESC, batch_id DESC
+                       ) AS day_rank
+                FROM fetch_batches
+            )
+            SELECT batch_id,
+                   CASE WHEN :expire_cutoff IS NOT NULL AND fetched_at < :expire_cutoff
+                        THEN 'expired' ELSE 'downsampled' END AS reason
+            FROM ranked
+            WHERE recent_rank > :keep_latest
+              AND ((:expire_cutoff IS NOT NULL AND fetched_at < :expire_cutoff)
+                   OR (fetched_at < :daily_cutoff AND day_rank > 1))
+        ''', {
+            "keep_latest": policy["keep_latest"],
+            "daily_cutoff": daily_cutoff,
+            "expire_cutoff": expire_cutoff,
+        })
+        counts = dict(conn.execute(
+            'SELECT reason, COUNT(*) FROM temp.expired_batches GROUP BY reason'
+        ).fetchall())
+        deleted = delete_batches(conn, 'SELECT batch_id FROM temp.expired_batches')
+        conn.execute('DROP TABLE temp.expired_batches')
+    if deleted:
+        # 削除したスナップショットを履歴表示のキャッシュから返さないようにする
+        forecast_cache.clear()
+
+    return {
+        "batches_deleted": deleted,
+        "expired": counts.get("expired", 0),
+        "downsampled": counts.get("downsampled", 0),
+    }
+
+
+def vacuum_incremental(convert=False):
+    # 既存DBを incremental モードへ切り替えるには一度だけ VACUUM が必要。VACUUM は完了まで
+    # 書き込みを止めるので、convert=True（CLI から実行したとき）だけ行い、アプリの保守スレッドでは行わない
+    with connection() as conn:
+        conn.commit()
+        before = _database_bytes(conn)
+        pending = conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2
+        if pending and convert:
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('VACUUM')
+            pending = False
+        elif not pending:
+            conn.execute('PRAGMA incremental_vacuum').fetchall()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+        after = _database_bytes(conn)
+    return None if pending else max(before - after, 0)
+
+
+def run_maintenance(policy=None, now=None, convert=False):
+    report = apply_retention(policy, now)
+    reclaimed = vacuum_incremental(convert)
+    # None は incremental への切り替え待ち（python retention.py で一度だけ VACUUM する）
+    report["vacuum_pending"] = reclaimed is None
+    report["bytes_reclaimed"] = reclaimed or 0
+    return report
+
+
+def start_maintenance_thread(interval=MAINTENANCE_INTERVAL, policy=None, on_report=None,
+                             initial_delay=MAINTENANCE_INITIAL_DELAY):
+    stop_event = threading.Event()
+
+    def loop():
+        if stop_event.wait(initial_delay):
+            return
+        while not stop_event.is_set():
+            try:
+                report = run_maintenance(policy)
+                if on_report:
+                    on_report(report)
+            except Exception as e:
+                print(f"DBの保守処理に失敗しました: {e}")
+            stop_event.wait(interval)
+
+    threading.Thread(target=loop, name="weather-db-maintenance", daemon=True).start()
+    return stop_event
+
+
+def main():
+    parser = argparse.ArgumentParser(description="予報履歴の保持ポリシーを適用し、DBを圧縮する")
+    parser.add_argument("--keep-latest", type=int, default=RETENTION_POLICY["keep_latest"])
+    parser.add_argument("--daily-after-days", type=int, default=RETENTION_POLICY["daily_after_days"])
+    parser.add_argument("--expire-after-days", type=int, default=RETENTION_POLICY["expire_after_days"])
+    args = parser.parse_args()
+
+    init_database()
+    report = run_maintenance({
+        "keep_latest": args.keep_latest,
+        "daily_after_days": args.daily_after_days,
+        "expire_after_days": args.expire_after_days,
+    }, convert=True)
+    print(
+        f"削除 {report['batches_deleted']} 件 "
+        f"(期限切れ {report['expired']} / 間引き {report['downsampled']}), "
+        f"回収 {report['bytes_reclaimed']:,} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()